@@ -0,0 +1,347 @@
+"""Throughput and latency benchmarks of the store and retrieve paths.
+
+Every scenario serializes messages of one payload size with ``dumps`` and
+deserializes them again with ``loads``, using the given number of threads.
+Run it from the repository root, e.g.::
+
+    python -m benchmarks.benchmark --output results.json
+    python -m benchmarks.benchmark --backend s3 --endpoint http://127.0.0.1:4566
+    python -m benchmarks.benchmark --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+import faust_large_message_serializer
+from faust_large_message_serializer import (
+    LargeMessageSerializer,
+    LargeMessageSerializerConfig,
+)
+from faust_large_message_serializer.blob_storage.registry import register_backend
+from benchmarks.memory_blob_storage import InMemoryBlobStorage
+
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/"
+    "K1SZFPTOtr/KBHBeksoGMGw==;BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+
+@dataclass
+class Scenario:
+    payload_size: int
+    backed_ratio: float
+    concurrency: int
+
+
+@dataclass
+class Result:
+    operation: str
+    payload_size: int
+    backed_ratio: float
+    concurrency: int
+    messages: int
+    total_bytes: int
+    seconds: float
+    throughput_mb_per_second: float
+    messages_per_second: float
+    p50_ms: float
+    p99_ms: float
+    peak_memory_bytes: int
+
+    @property
+    def scenario_key(self) -> Tuple[str, int, float, int]:
+        return self.operation, self.payload_size, self.backed_ratio, self.concurrency
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(float(item)) for item in value.split(",")]
+
+
+def parse_float_list(value: str) -> List[float]:
+    return [float(item) for item in value.split(",")]
+
+
+def create_scenarios(args: argparse.Namespace) -> List[Scenario]:
+    scenarios = []
+    for payload_size in args.sizes:
+        ratios = args.backed_ratios if payload_size > args.max_size else [0.0]
+        for backed_ratio in ratios:
+            for concurrency in args.concurrency:
+                scenarios.append(Scenario(payload_size, backed_ratio, concurrency))
+    return scenarios
+
+
+def create_payloads(scenario: Scenario, args: argparse.Namespace) -> List[bytes]:
+    count = max(
+        args.min_messages,
+        min(args.max_messages, args.total_bytes // scenario.payload_size),
+    )
+    large = os.urandom(scenario.payload_size)
+    small = os.urandom(max(1, args.max_size // 2))
+    payloads = []
+    for index in range(count):
+        # interleaves backed and inline payloads according to the ratio
+        is_backed = int((index + 1) * scenario.backed_ratio) > int(
+            index * scenario.backed_ratio
+        )
+        payloads.append(
+            large if is_backed or scenario.payload_size <= args.max_size else small
+        )
+    return payloads
+
+
+def percentile(latencies: List[float], percent: float) -> float:
+    ordered = sorted(latencies)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def measure_peak_memory(
+    function: Callable[[bytes], bytes], inputs: List[bytes], concurrency: int
+) -> int:
+    # tracing slows down every allocation, so it runs apart from the timed pass
+    tracemalloc.start()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in executor.map(function, inputs):
+            pass
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak_memory
+
+
+def measure(
+    operation: str,
+    function: Callable[[bytes], bytes],
+    inputs: List[bytes],
+    sizes: List[int],
+    scenario: Scenario,
+) -> Tuple[Result, List[bytes]]:
+    def timed(item: bytes) -> Tuple[bytes, float]:
+        start = time.perf_counter()
+        output = function(item)
+        return output, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=scenario.concurrency) as executor:
+        outputs = list(executor.map(timed, inputs))
+    seconds = time.perf_counter() - start
+    peak_memory = measure_peak_memory(function, inputs, scenario.concurrency)
+
+    latencies = [latency for _, latency in outputs]
+    total_bytes = sum(sizes)
+    result = Result(
+        operation=operation,
+        payload_size=scenario.payload_size,
+        backed_ratio=scenario.backed_ratio,
+        concurrency=scenario.concurrency,
+        messages=len(inputs),
+        total_bytes=total_bytes,
+        seconds=seconds,
+        throughput_mb_per_second=total_bytes / seconds / 1000 / 1000,
+        messages_per_second=len(inputs) / seconds,
+        p50_ms=statistics.median(latencies) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        peak_memory_bytes=peak_memory,
+    )
+    return result, [output for output, _ in outputs]
+
+
+def run_scenario(
+    config: LargeMessageSerializerConfig, scenario: Scenario, args: argparse.Namespace
+) -> List[Result]:
+    serializer = LargeMessageSerializer(args.topic, config)
+    payloads = create_payloads(scenario, args)
+    sizes = [len(payload) for payload in payloads]
+
+    dumps_result, serialized = measure(
+        "dumps", serializer.dumps, payloads, sizes, scenario
+    )
+    loads_result, deserialized = measure(
+        "loads", serializer.loads, serialized, sizes, scenario
+    )
+    if deserialized != payloads:
+        raise AssertionError(f"Round trip failed for {scenario}")
+    return [dumps_result, loads_result]
+
+
+def create_config(args: argparse.Namespace) -> LargeMessageSerializerConfig:
+    if args.backend == "memory":
+        register_backend(
+            InMemoryBlobStorage.PROTOCOL, lambda config: InMemoryBlobStorage()
+        )
+        return LargeMessageSerializerConfig(
+            f"{InMemoryBlobStorage.PROTOCOL}://{args.bucket}",
+            args.max_size,
+            large_message_zero_copy_loads=args.zero_copy,
+        )
+
+    if args.backend == "file":
+        return LargeMessageSerializerConfig(
+            f"file://{os.path.abspath(args.directory)}",
+            args.max_size,
+            large_message_zero_copy_loads=args.zero_copy,
+        )
+
+    if args.backend == "s3":
+        import boto3
+
+        config = LargeMessageSerializerConfig(
+            f"s3://{args.bucket}",
+            args.max_size,
+            large_message_s3_secret_key=args.secret_key,
+            large_message_s3_access_key=args.access_key,
+            large_message_s3_region=args.region,
+            large_message_s3_endpoint=args.endpoint,
+            large_message_zero_copy_loads=args.zero_copy,
+        )
+        s3 = boto3.resource(
+            "s3",
+            aws_secret_access_key=args.secret_key,
+            aws_access_key_id=args.access_key,
+            region_name=args.region,
+            endpoint_url=args.endpoint,
+        )
+        if s3.Bucket(args.bucket).creation_date is None:
+            s3.Bucket(args.bucket).create()
+        return config
+
+    from azure.storage.blob import BlobServiceClient
+
+    config = LargeMessageSerializerConfig(
+        f"abs://{args.bucket}",
+        args.max_size,
+        large_message_abs_connection_string=args.connection_string,
+        large_message_zero_copy_loads=args.zero_copy,
+    )
+    container = BlobServiceClient.from_connection_string(
+        args.connection_string
+    ).get_container_client(args.bucket)
+    if not container.exists():
+        container.create_container()
+    return config
+
+
+def print_results(results: List[Result], baseline: Optional[Dict] = None) -> None:
+    header = (
+        f"{'operation':<9} {'size':>11} {'backed':>6} {'threads':>7} {'MB/s':>9} "
+        f"{'msg/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'peak MB':>8}"
+    )
+    if baseline is not None:
+        header += f" {'MB/s diff':>9}"
+    print(header)
+    for result in results:
+        line = (
+            f"{result.operation:<9} {result.payload_size:>11} {result.backed_ratio:>6.2f} "
+            f"{result.concurrency:>7} {result.throughput_mb_per_second:>9.1f} "
+            f"{result.messages_per_second:>9.1f} {result.p50_ms:>9.2f} "
+            f"{result.p99_ms:>9.2f} {result.peak_memory_bytes / 1000 / 1000:>8.1f}"
+        )
+        if baseline is not None:
+            previous = baseline.get(result.scenario_key)
+            if previous is not None:
+                change = (
+                    result.throughput_mb_per_second / previous.throughput_mb_per_second
+                    - 1
+                )
+                line += f" {change:>+9.1%}"
+        print(line)
+
+
+def load_results(path: str) -> Dict[Tuple[str, int, float, int], Result]:
+    with open(path) as file:
+        report = json.load(file)
+    results = [Result(**result) for result in report["results"]]
+    return {result.scenario_key: result for result in results}
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--backend", choices=["memory", "file", "s3", "abs"], default="memory"
+    )
+    parser.add_argument(
+        "--directory",
+        default="benchmark-blobs",
+        help="directory of the file backend",
+    )
+    parser.add_argument("--bucket", default="benchmark-bucket")
+    parser.add_argument("--topic", default="benchmark-topic")
+    parser.add_argument("--max-size", type=int, default=1000 * 1000)
+    parser.add_argument(
+        "--sizes",
+        type=parse_int_list,
+        default=parse_int_list("1e3,5e5,2e6,2e7,2e8"),
+        help="comma separated payload sizes in bytes",
+    )
+    parser.add_argument(
+        "--backed-ratios",
+        type=parse_float_list,
+        default=parse_float_list("0.1,0.5,1"),
+        help="share of messages above max size, the others are inline",
+    )
+    parser.add_argument(
+        "--concurrency", type=parse_int_list, default=parse_int_list("1,8")
+    )
+    parser.add_argument(
+        "--zero-copy",
+        action="store_true",
+        help="let loads return memory views instead of copying payloads",
+    )
+    parser.add_argument("--total-bytes", type=int, default=400 * 1000 * 1000)
+    parser.add_argument("--min-messages", type=int, default=3)
+    parser.add_argument("--max-messages", type=int, default=2000)
+    parser.add_argument("--endpoint", default="http://127.0.0.1:4566")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--access-key", default="fake_key")
+    parser.add_argument("--secret-key", default="fake_secret")
+    parser.add_argument("--connection-string", default=AZURITE_CONNECTION_STRING)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument(
+        "--compare", help="JSON results of a previous run to compare with"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+    logger.remove()
+    config = create_config(args)
+    baseline = load_results(args.compare) if args.compare else None
+
+    results = []
+    for scenario in create_scenarios(args):
+        results += run_scenario(config, scenario, args)
+        config.create_cleaning_client().delete_all_objects(args.topic)
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            "version": faust_large_message_serializer.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "backend": args.backend,
+            "max_size": args.max_size,
+            "zero_copy": args.zero_copy,
+            "results": [asdict(result) for result in results],
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, Iterator, List, Tuple
+
+from faust_large_message_serializer.blob_storage.blob_storage import (
+    BlobObject,
+    BlobStorageClient,
+)
+
+
+class InMemoryBlobStorage(BlobStorageClient):
+
+    PROTOCOL = "memory"
+
+    def __init__(self):
+        self._objects: Dict[str, Tuple[bytes, datetime]] = {}
+        self._lock = Lock()
+
+    def put_object(self, data: bytes, bucket: str, key: str) -> str:
+        with self._lock:
+            self._objects[f"{bucket}/{key}"] = (
+                bytes(data),
+                datetime.now(timezone.utc),
+            )
+        return f"{self.PROTOCOL}://{bucket}/{key}"
+
+    def get_object(self, bucket: str, key: str) -> bytes:
+        return self._objects[f"{bucket}/{key}"][0]
+
+    def object_exists(self, bucket: str, key: str) -> bool:
+        return f"{bucket}/{key}" in self._objects
+
+    def list_objects(self, bucket: str, prefix: str) -> Iterator[BlobObject]:
+        with self._lock:
+            objects = list(self._objects.items())
+        for name, (data, last_modified) in objects:
+            if name.startswith(f"{bucket}/{prefix}"):
+                yield BlobObject(name[len(bucket) + 1 :], last_modified, len(data))
+
+    def delete_objects(self, bucket: str, objects: List[BlobObject]) -> int:
+        with self._lock:
+            for blob in objects:
+                self._objects.pop(f"{bucket}/{blob.key}", None)
+        return len(objects)
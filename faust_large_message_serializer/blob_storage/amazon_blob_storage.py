@@ -1,4 +1,39 @@
-from faust_large_message_serializer.blob_storage.blob_storage import BlobStorageClient
+from functools import partial
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, List, Optional, Union
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+from loguru import logger
+
+from faust_large_message_serializer.blob_storage.blob_storage import (
+    BlobObject,
+    BlobStorageClient,
+)
+from faust_large_message_serializer.blob_storage.buffer_pool import BufferPool
+from faust_large_message_serializer.blob_storage.shared_clients import (
+    freeze,
+    get_shared_client,
+)
+from faust_large_message_serializer.blob_storage.transfer import (
+    TransferConfig,
+    iter_windows,
+    read_chunk,
+    read_into,
+    split_parts,
+    transfer_parts,
+)
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    Instrumentation,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from faust_large_message_serializer.config import LargeMessageSerializerConfig
 
 
 class S3UploadException(Exception):
@@ -8,28 +43,245 @@ class S3UploadException(Exception):
 class AmazonS3Client(BlobStorageClient):
 
     PROTOCOL = "s3"
+    NOT_FOUND_CODES = {"404", "NoSuchKey", "NotFound"}
+    RETRYABLE_CODES = {
+        "SlowDown",
+        "Throttling",
+        "ThrottlingException",
+        "RequestLimitExceeded",
+        "RequestTimeout",
+        "InternalError",
+        "ServiceUnavailable",
+    }
 
-    def __init__(self, s3_client):
+    def __init__(
+        self,
+        s3_client,
+        transfer_config: Optional[TransferConfig] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        buffer_pool: Optional[BufferPool] = None,
+    ):
         self._s3_client = s3_client
+        self._transfer_config = transfer_config or TransferConfig()
+        self._instrumentation = instrumentation or Instrumentation()
+        self._buffer_pool = buffer_pool
 
-    def delete_all_objects(self, bucket: str, prefix: str) -> None:
-        objects_response = self._s3_client.list_object_versions(
-            Bucket=bucket, Prefix=prefix
-        )
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, S3UploadException):
+            # failed multipart uploads keep the error of the request as cause
+            return error.__cause__ is None or self.is_retryable(error.__cause__)
+        if isinstance(error, ClientError):
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            code = error.response.get("Error", {}).get("Code")
+            return (
+                code in self.RETRYABLE_CODES
+                or status == 429
+                or (status is not None and status >= 500)
+            )
+        return isinstance(
+            error, (EndpointConnectionError, ConnectionClosedError, ReadTimeoutError)
+        ) or super().is_retryable(error)
+
+    def list_objects(self, bucket: str, prefix: str) -> Iterator[BlobObject]:
+        paginator = self._s3_client.get_paginator("list_object_versions")
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for version in page.get("Versions", []) + page.get("DeleteMarkers", []):
+                yield BlobObject(
+                    version["Key"],
+                    version["LastModified"],
+                    version.get("Size", 0),
+                    version.get("VersionId"),
+                )
+
+    def delete_objects(self, bucket: str, objects: List[BlobObject]) -> int:
         key_objects = [
-            {"Key": object_s3["Key"], "VersionId": object_s3["VersionId"]}
-            for object_s3 in objects_response["Versions"]
+            (
+                {"Key": blob.key, "VersionId": blob.version_id}
+                if blob.version_id
+                else {"Key": blob.key}
+            )
+            for blob in objects
         ]
-        self._s3_client.delete_objects(Bucket=bucket, Delete={"Objects": key_objects})
+        response = self._s3_client.delete_objects(
+            Bucket=bucket, Delete={"Objects": key_objects, "Quiet": True}
+        )
+        errors = response.get("Errors", [])
+        for error in errors:
+            logger.warning(
+                "Could not delete {} from S3: {}", error["Key"], error["Message"]
+            )
+        return len(objects) - len(errors)
 
     def put_object(self, data: bytes, bucket: str, key: str) -> str:
+        if len(data) > self._transfer_config.multipart_threshold:
+            return self.__put_multipart_object([data], bucket, key)
         response = self._s3_client.put_object(Bucket=bucket, Key=key, Body=data)
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
             return f"{self.PROTOCOL}://{bucket}/{key}"
         else:
             raise S3UploadException(f"Error uploading blob to S3: {str(response)}")
 
-    def get_object(self, bucket: str, key: str) -> bytes:
-        object_metadata = self._s3_client.get_object(Bucket=bucket, Key=key)
-        raw_object = object_metadata["Body"].read()
-        return raw_object
+    def put_object_stream(self, stream: BinaryIO, bucket: str, key: str) -> str:
+        threshold = self._transfer_config.multipart_threshold
+        data = read_chunk(stream, threshold + 1)
+        if len(data) <= threshold:
+            return self.put_object(data, bucket, key)
+        windows = iter_windows(
+            data,
+            stream,
+            self._transfer_config.part_size,
+            self._transfer_config.part_size * self._transfer_config.max_concurrency,
+        )
+        return self.__put_multipart_object(windows, bucket, key)
+
+    def __put_multipart_object(
+        self, windows: Iterable[bytes], bucket: str, key: str
+    ) -> str:
+        upload_id = self._s3_client.create_multipart_upload(Bucket=bucket, Key=key)[
+            "UploadId"
+        ]
+
+        def upload_parts(data: bytes, first_part_number: int) -> List[dict]:
+            def upload_part(index: int, start: int, end: int) -> dict:
+                response = self._s3_client.upload_part(
+                    Bucket=bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=first_part_number + index,
+                    Body=data[start:end],
+                )
+                return {
+                    "ETag": response["ETag"],
+                    "PartNumber": first_part_number + index,
+                }
+
+            return transfer_parts(
+                split_parts(len(data), self._transfer_config.part_size),
+                upload_part,
+                self._transfer_config.max_concurrency,
+                self._transfer_config.create_part_retry_policy(),
+                self.is_retryable,
+                partial(self._instrumentation.on_retry, "upload_part"),
+            )
+
+        try:
+            parts = []
+            for window in windows:
+                parts += upload_parts(window, len(parts) + 1)
+            self._s3_client.complete_multipart_upload(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception as e:
+            self._s3_client.abort_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id
+            )
+            raise S3UploadException(f"Error uploading blob to S3: {str(e)}") from e
+        return f"{self.PROTOCOL}://{bucket}/{key}"
+
+    def get_object(self, bucket: str, key: str) -> Union[bytes, memoryview]:
+        chunk_size = self._transfer_config.download_chunk_size
+        try:
+            object_metadata = self._s3_client.get_object(
+                Bucket=bucket, Key=key, Range=f"bytes=0-{chunk_size - 1}"
+            )
+        except ClientError as e:
+            # empty objects cannot be requested by range
+            if e.response.get("Error", {}).get("Code") != "InvalidRange":
+                raise
+            object_metadata = self._s3_client.get_object(Bucket=bucket, Key=key)
+
+        content_range = object_metadata.get("ContentRange")
+        size = int(content_range.rsplit("/", 1)[1]) if content_range else 0
+        if size <= chunk_size:
+            if self._buffer_pool is None or not size:
+                raw_object = object_metadata["Body"].read()
+                return raw_object
+            view = self._buffer_pool.acquire(size)
+            read_into(object_metadata["Body"], view)
+            return view
+        return self.__get_ranged_object(bucket, key, size, object_metadata["Body"])
+
+    def __get_ranged_object(
+        self, bucket: str, key: str, size: int, first_chunk
+    ) -> Union[bytearray, memoryview]:
+        if self._buffer_pool is None:
+            buffer = bytearray(size)
+            view = memoryview(buffer)
+        else:
+            buffer = view = self._buffer_pool.acquire(size)
+        parts = split_parts(size, self._transfer_config.download_chunk_size)
+        read_into(first_chunk, view[: parts[0][1]])
+
+        def download_range(index: int, start: int, end: int) -> None:
+            object_metadata = self._s3_client.get_object(
+                Bucket=bucket, Key=key, Range=f"bytes={start}-{end - 1}"
+            )
+            read_into(object_metadata["Body"], view[start:end])
+
+        transfer_parts(
+            parts[1:],
+            download_range,
+            self._transfer_config.download_max_concurrency,
+            self._transfer_config.create_part_retry_policy(),
+            self.is_retryable,
+            partial(self._instrumentation.on_retry, "download_range"),
+        )
+        return buffer
+
+    def get_object_range(self, bucket: str, key: str, start: int, end: int) -> bytes:
+        if end <= start:
+            return b""
+        object_metadata = self._s3_client.get_object(
+            Bucket=bucket, Key=key, Range=f"bytes={start}-{end - 1}"
+        )
+        return object_metadata["Body"].read()
+
+    def open_object(self, bucket: str, key: str) -> BinaryIO:
+        return self._s3_client.get_object(Bucket=bucket, Key=key)["Body"]
+
+    def object_exists(self, bucket: str, key: str) -> bool:
+        try:
+            self._s3_client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in self.NOT_FOUND_CODES:
+                return False
+            raise
+        return True
+
+
+def create_amazon_s3_client(config: "LargeMessageSerializerConfig") -> AmazonS3Client:
+    s3_config = {
+        "aws_secret_access_key": config.large_message_s3_secret_key,
+        "aws_access_key_id": config.large_message_s3_access_key,
+        "region_name": config.large_message_s3_region,
+    }
+    if config.large_message_s3_endpoint:
+        s3_config["endpoint_url"] = config.large_message_s3_endpoint
+
+    if config.large_message_blob_storage_custom_config:
+        config.large_message_blob_storage_custom_config(s3_config)
+
+    def create_client():
+        client_config = Config(
+            max_pool_connections=config.large_message_max_pool_connections,
+            connect_timeout=config.large_message_connect_timeout,
+            read_timeout=config.large_message_read_timeout,
+            tcp_keepalive=config.large_message_tcp_keepalive,
+        )
+        if "config" in s3_config:
+            client_config = client_config.merge(s3_config["config"])
+        return boto3.client("s3", **{**s3_config, "config": client_config})
+
+    key = freeze(s3_config) if config.large_message_share_clients else None
+    if key is not None:
+        key = ("s3", key, *config.create_pool_settings())
+    s3_client = get_shared_client(key, create_client)
+    return AmazonS3Client(
+        s3_client,
+        config.create_transfer_config(),
+        config.large_message_instrumentation,
+        config.get_buffer_pool(),
+    )
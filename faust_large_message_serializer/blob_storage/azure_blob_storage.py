@@ -1,28 +1,213 @@
-from azure.storage.blob import BlobServiceClient
+import base64
+import io
+from functools import partial
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, List, Optional, Union
 
-from faust_large_message_serializer.blob_storage.blob_storage import BlobStorageClient
+from azure.core.exceptions import (
+    HttpResponseError,
+    ServiceRequestError,
+    ServiceResponseError,
+)
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobBlock, BlobServiceClient
+from requests import Session
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from faust_large_message_serializer.blob_storage.blob_storage import (
+    BlobObject,
+    BlobStorageClient,
+)
+from faust_large_message_serializer.blob_storage.buffer_pool import BufferPool
+from faust_large_message_serializer.blob_storage.shared_clients import (
+    freeze,
+    get_shared_client,
+)
+from faust_large_message_serializer.blob_storage.transfer import (
+    BufferWriter,
+    IteratorReader,
+    TransferConfig,
+    iter_windows,
+    read_chunk,
+    split_parts,
+    transfer_parts,
+)
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    Instrumentation,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from faust_large_message_serializer.config import LargeMessageSerializerConfig
 
 
 class AzureBlobStorageClient(BlobStorageClient):
 
     PROTOCOL = "abs"
+    MAX_DELETE_BATCH_SIZE = 256
 
-    def __init__(self, abs_service_client: BlobServiceClient):
+    def __init__(
+        self,
+        abs_service_client: BlobServiceClient,
+        transfer_config: Optional[TransferConfig] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        buffer_pool: Optional[BufferPool] = None,
+    ):
         self._abs_client = abs_service_client
+        self._transfer_config = transfer_config or TransferConfig()
+        self._instrumentation = instrumentation or Instrumentation()
+        self._buffer_pool = buffer_pool
 
-    def delete_all_objects(self, bucket: str, prefix: str) -> None:
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, HttpResponseError) and error.status_code is not None:
+            return error.status_code in (408, 429) or error.status_code >= 500
+        return isinstance(
+            error, (ServiceRequestError, ServiceResponseError)
+        ) or super().is_retryable(error)
+
+    def list_objects(self, bucket: str, prefix: str) -> Iterator[BlobObject]:
         container_client = self._abs_client.get_container_client(bucket)
-        blobs = container_client.list_blobs(name_starts_with=prefix)
-        for blob in blobs:
-            container_client.delete_blob(blob.name)
+        for blob in container_client.list_blobs(name_starts_with=prefix):
+            yield BlobObject(blob.name, blob.last_modified, blob.size)
+
+    def delete_objects(self, bucket: str, objects: List[BlobObject]) -> int:
+        container_client = self._abs_client.get_container_client(bucket)
+        responses = container_client.delete_blobs(
+            *(blob.key for blob in objects), raise_on_any_failure=False
+        )
+        deleted = 0
+        for blob, response in zip(objects, responses):
+            # blobs that are already gone count as deleted
+            if response.status_code in (202, 404):
+                deleted += 1
+            else:
+                logger.warning(
+                    "Could not delete {} from Azure Blob Storage: {}",
+                    blob.key,
+                    response.reason,
+                )
+        return deleted
 
     def put_object(self, data: bytes, bucket: str, key: str) -> str:
         container_client = self._abs_client.get_container_client(bucket)
         blob_client = container_client.get_blob_client(key)
-        blob_client.upload_blob(data)
+        if len(data) > self._transfer_config.multipart_threshold:
+            self.__put_staged_blocks(blob_client, [data])
+        else:
+            blob_client.upload_blob(data)
         return f"{self.PROTOCOL}://{bucket}/{key}"
 
-    def get_object(self, bucket: str, key: str) -> bytes:
+    def put_object_stream(self, stream: BinaryIO, bucket: str, key: str) -> str:
+        threshold = self._transfer_config.multipart_threshold
+        data = read_chunk(stream, threshold + 1)
+        if len(data) <= threshold:
+            return self.put_object(data, bucket, key)
         container_client = self._abs_client.get_container_client(bucket)
         blob_client = container_client.get_blob_client(key)
-        return blob_client.download_blob().readall()
+        windows = iter_windows(
+            data,
+            stream,
+            self._transfer_config.part_size,
+            self._transfer_config.part_size * self._transfer_config.max_concurrency,
+        )
+        self.__put_staged_blocks(blob_client, windows)
+        return f"{self.PROTOCOL}://{bucket}/{key}"
+
+    def __put_staged_blocks(self, blob_client, windows: Iterable[bytes]) -> None:
+        # uncommitted blocks cannot be deleted explicitly, Azure discards them
+        # after a week if the block list of a failed upload is never committed
+        def stage_blocks(data: bytes, first_index: int) -> List[BlobBlock]:
+            def stage_block(index: int, start: int, end: int) -> BlobBlock:
+                block_id = base64.b64encode(
+                    f"{first_index + index:08d}".encode()
+                ).decode()
+                blob_client.stage_block(block_id, data[start:end])
+                return BlobBlock(block_id=block_id)
+
+            return transfer_parts(
+                split_parts(len(data), self._transfer_config.part_size),
+                stage_block,
+                self._transfer_config.max_concurrency,
+                self._transfer_config.create_part_retry_policy(),
+                self.is_retryable,
+                partial(self._instrumentation.on_retry, "upload_part"),
+            )
+
+        blocks = []
+        for window in windows:
+            blocks += stage_blocks(window, len(blocks))
+        blob_client.commit_block_list(blocks)
+
+    def get_object(self, bucket: str, key: str) -> Union[bytes, memoryview]:
+        container_client = self._abs_client.get_container_client(bucket)
+        blob_client = container_client.get_blob_client(key)
+        downloader = blob_client.download_blob(
+            max_concurrency=self._transfer_config.download_max_concurrency
+        )
+        if self._buffer_pool is not None and downloader.size:
+            view = self._buffer_pool.acquire(downloader.size)
+            downloader.readinto(BufferWriter(view))
+            return view
+        if downloader.size <= self._transfer_config.download_chunk_size:
+            return downloader.readall()
+        buffer = bytearray(downloader.size)
+        downloader.readinto(BufferWriter(buffer))
+        return buffer
+
+    def get_object_range(self, bucket: str, key: str, start: int, end: int) -> bytes:
+        if end <= start:
+            return b""
+        container_client = self._abs_client.get_container_client(bucket)
+        blob_client = container_client.get_blob_client(key)
+        return blob_client.download_blob(offset=start, length=end - start).readall()
+
+    def open_object(self, bucket: str, key: str) -> BinaryIO:
+        container_client = self._abs_client.get_container_client(bucket)
+        blob_client = container_client.get_blob_client(key)
+        downloader = blob_client.download_blob()
+        return io.BufferedReader(IteratorReader(downloader.chunks()))
+
+    def object_exists(self, bucket: str, key: str) -> bool:
+        container_client = self._abs_client.get_container_client(bucket)
+        blob_client = container_client.get_blob_client(key)
+        return blob_client.exists()
+
+
+def create_azure_blob_storage_client(
+    config: "LargeMessageSerializerConfig",
+) -> AzureBlobStorageClient:
+    abs_config = {
+        "conn_str": config.large_message_abs_connection_string,
+        "max_single_get_size": config.large_message_download_chunk_size,
+        "max_chunk_get_size": config.large_message_download_chunk_size,
+    }
+    if config.large_message_blob_storage_custom_config:
+        config.large_message_blob_storage_custom_config(abs_config)
+
+    def create_client():
+        adapter = HTTPAdapter(
+            pool_connections=config.large_message_max_pool_connections,
+            pool_maxsize=config.large_message_max_pool_connections,
+        )
+        session = Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        transport = RequestsTransport(
+            session=session,
+            session_owner=False,
+            connection_timeout=config.large_message_connect_timeout,
+            read_timeout=config.large_message_read_timeout,
+        )
+        return BlobServiceClient.from_connection_string(
+            **{"transport": transport, **abs_config}
+        )
+
+    key = freeze(abs_config) if config.large_message_share_clients else None
+    if key is not None:
+        key = ("abs", key, *config.create_pool_settings())
+    abs_client = get_shared_client(key, create_client)
+    return AzureBlobStorageClient(
+        abs_client,
+        config.create_transfer_config(),
+        config.large_message_instrumentation,
+        config.get_buffer_pool(),
+    )
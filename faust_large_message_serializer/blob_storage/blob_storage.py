@@ -1,11 +1,67 @@
+import io
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, Optional
+
+
+@dataclass(frozen=True)
+class BlobObject:
+    key: str
+    last_modified: datetime
+    size: int
+    version_id: Optional[str] = None
+
+
+def iter_batches(
+    objects: Iterable[BlobObject], size: int
+) -> Iterator[List[BlobObject]]:
+    iterator = iter(objects)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
 
 
 class BlobStorageClient(ABC):
 
-    @abstractmethod
-    def delete_all_objects(self, bucket: str, prefix: str) -> None: ...
+    # maximal number of objects that are deleted with one request
+    MAX_DELETE_BATCH_SIZE = 1000
+
+    def delete_all_objects(self, bucket: str, prefix: str) -> None:
+        for batch in iter_batches(
+            self.list_objects(bucket, prefix), self.MAX_DELETE_BATCH_SIZE
+        ):
+            self.delete_objects(bucket, batch)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Whether a failed request may succeed when it is sent again."""
+        return isinstance(error, (ConnectionError, TimeoutError))
+
+    def put_object_stream(self, stream: BinaryIO, bucket: str, key: str) -> str:
+        return self.put_object(stream.read(), bucket, key)
+
+    def get_sized_object(self, bucket: str, key: str, size: int) -> bytes:
+        """Like ``get_object`` for a blob whose size is known in advance, e.g.
+        from a compact pointer."""
+        return self.get_object(bucket, key)
+
+    def get_object_range(self, bucket: str, key: str, start: int, end: int) -> bytes:
+        """Returns the bytes from ``start`` up to, but excluding, ``end``."""
+        return self.get_object(bucket, key)[start:end]
+
+    def open_object(self, bucket: str, key: str) -> BinaryIO:
+        return io.BytesIO(self.get_object(bucket, key))
+
     @abstractmethod
     def put_object(self, data: bytes, bucket: str, key: str) -> str: ...
     @abstractmethod
     def get_object(self, bucket: str, key: str) -> bytes: ...
+    @abstractmethod
+    def object_exists(self, bucket: str, key: str) -> bool: ...
+    @abstractmethod
+    def list_objects(self, bucket: str, prefix: str) -> Iterator[BlobObject]: ...
+    @abstractmethod
+    def delete_objects(self, bucket: str, objects: List[BlobObject]) -> int:
+        """Deletes at most ``MAX_DELETE_BATCH_SIZE`` objects and returns how many were deleted."""
@@ -0,0 +1,57 @@
+from threading import Lock
+from typing import List
+
+
+def _is_exported(buffer: bytearray) -> bool:
+    # bytearrays cannot be resized while memory views of them exist, and
+    # shrinking by one byte never reallocates
+    try:
+        last = buffer.pop()
+    except BufferError:
+        return True
+    buffer.append(last)
+    return False
+
+
+class BufferPool:
+    """Pool of reusable download buffers.
+
+    Buffers are handed out as memory views and are reused once all views of
+    them, including slices, are released. Callers may therefore keep a view as
+    long as they need, e.g. in a cache, without it being overwritten.
+    """
+
+    def __init__(self, max_buffers: int, max_buffer_size: int):
+        self._max_buffers = max_buffers
+        self._max_buffer_size = max_buffer_size
+        self._buffers: List[bytearray] = []
+        self._lock = Lock()
+
+    def acquire(self, size: int) -> memoryview:
+        if size <= 0 or size > self._max_buffer_size:
+            return memoryview(bytearray(size))
+
+        with self._lock:
+            free = [
+                index
+                for index, buffer in enumerate(self._buffers)
+                if not _is_exported(buffer)
+            ]
+            fitting = [index for index in free if len(self._buffers[index]) >= size]
+            if fitting:
+                buffer = self._buffers[
+                    min(fitting, key=lambda index: len(self._buffers[index]))
+                ]
+            elif len(self._buffers) < self._max_buffers:
+                buffer = bytearray(size)
+                self._buffers.append(buffer)
+            elif free:
+                # replaces the smallest free buffer, so buffers grow with the payloads
+                smallest = min(free, key=lambda index: len(self._buffers[index]))
+                buffer = bytearray(size)
+                self._buffers[smallest] = buffer
+            else:
+                return memoryview(bytearray(size))
+            # the view is created with the lock held, so no other thread can
+            # acquire the buffer in between
+            return memoryview(buffer)[:size]
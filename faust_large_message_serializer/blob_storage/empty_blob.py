@@ -1,4 +1,9 @@
-from faust_large_message_serializer.blob_storage.blob_storage import BlobStorageClient
+from typing import Iterator, List
+
+from faust_large_message_serializer.blob_storage.blob_storage import (
+    BlobObject,
+    BlobStorageClient,
+)
 
 
 class EmptyBlobStorage(BlobStorageClient):
@@ -10,3 +15,12 @@ class EmptyBlobStorage(BlobStorageClient):
 
     def get_object(self, bucket: str, key: str) -> bytes:
         raise NotImplementedError()
+
+    def object_exists(self, bucket: str, key: str) -> bool:
+        raise NotImplementedError()
+
+    def list_objects(self, bucket: str, prefix: str) -> Iterator[BlobObject]:
+        raise NotImplementedError()
+
+    def delete_objects(self, bucket: str, objects: List[BlobObject]) -> int:
+        raise NotImplementedError()
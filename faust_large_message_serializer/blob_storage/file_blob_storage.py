@@ -0,0 +1,121 @@
+import mmap
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterator, List
+
+from faust_large_message_serializer.blob_storage.blob_storage import (
+    BlobObject,
+    BlobStorageClient,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from faust_large_message_serializer.config import LargeMessageSerializerConfig
+
+
+class FileBlobStorageClient(BlobStorageClient):
+    """Stores blobs as files below ``root``, e.g. on a shared NFS volume.
+
+    The bucket of a ``file:///mnt/shared/path`` URI is empty, so blobs are stored
+    at their absolute path.
+    """
+
+    PROTOCOL = "file"
+    TEMP_PREFIX = ".tmp-"
+
+    def __init__(self, root: str = "/"):
+        self._root = root
+
+    def delete_all_objects(self, bucket: str, prefix: str) -> None:
+        path = self.__path(bucket, prefix)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        directory, name_prefix = os.path.split(path)
+        if not os.path.isdir(directory):
+            return
+        for entry in os.scandir(directory):
+            if not entry.name.startswith(name_prefix):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def put_object(self, data: bytes, bucket: str, key: str) -> str:
+        return self.__write(bucket, key, lambda file: file.write(data))
+
+    def put_object_stream(self, stream: BinaryIO, bucket: str, key: str) -> str:
+        return self.__write(bucket, key, lambda file: shutil.copyfileobj(stream, file))
+
+    def __write(
+        self, bucket: str, key: str, write: Callable[[BinaryIO], object]
+    ) -> str:
+        path = self.__path(bucket, key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=self.TEMP_PREFIX, dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                write(file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return f"{self.PROTOCOL}://{bucket}/{key}"
+
+    def get_object(self, bucket: str, key: str) -> memoryview:
+        with open(self.__path(bucket, key), "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return memoryview(b"")
+            return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def open_object(self, bucket: str, key: str) -> BinaryIO:
+        return open(self.__path(bucket, key), "rb")
+
+    def object_exists(self, bucket: str, key: str) -> bool:
+        return os.path.isfile(self.__path(bucket, key))
+
+    def list_objects(self, bucket: str, prefix: str) -> Iterator[BlobObject]:
+        bucket_path = self.__path(bucket, "")
+        path = self.__path(bucket, prefix)
+        start = path if os.path.isdir(path) else os.path.dirname(path)
+        for directory, _, files in os.walk(start):
+            for name in files:
+                file_path = os.path.join(directory, name)
+                if not file_path.startswith(path):
+                    continue
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                yield BlobObject(
+                    os.path.relpath(file_path, bucket_path),
+                    datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                    stat.st_size,
+                )
+
+    def delete_objects(self, bucket: str, objects: List[BlobObject]) -> int:
+        deleted = 0
+        for blob in objects:
+            try:
+                os.unlink(self.__path(bucket, blob.key))
+            except FileNotFoundError:
+                pass
+            deleted += 1
+        return deleted
+
+    def __path(self, bucket: str, key: str) -> str:
+        return os.path.join(self._root, bucket, key)
+
+
+def create_file_blob_storage_client(
+    config: "LargeMessageSerializerConfig",
+) -> FileBlobStorageClient:
+    return FileBlobStorageClient()
@@ -0,0 +1,83 @@
+"""Registry of blob storage backends by URI scheme.
+
+Backends are factories that create a ``BlobStorageClient`` from a
+``LargeMessageSerializerConfig``. They are only imported when a base path with
+their scheme is used, so deployments do not pay for SDKs they do not need.
+Third-party packages can register backends with an entry point in the
+``faust_large_message_serializer.backends`` group, named after the scheme::
+
+    [project.entry-points."faust_large_message_serializer.backends"]
+    gs = "my_package.gcs:create_gcs_client"
+"""
+
+from importlib import import_module
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Union
+
+from faust_large_message_serializer.blob_storage.blob_storage import BlobStorageClient
+
+if TYPE_CHECKING:  # pragma: no cover
+    from faust_large_message_serializer.config import LargeMessageSerializerConfig
+
+BackendFactory = Callable[["LargeMessageSerializerConfig"], BlobStorageClient]
+
+ENTRY_POINT_GROUP = "faust_large_message_serializer.backends"
+
+_backends: Dict[str, Union[str, BackendFactory]] = {
+    "s3": "faust_large_message_serializer.blob_storage.amazon_blob_storage:create_amazon_s3_client",
+    "abs": "faust_large_message_serializer.blob_storage.azure_blob_storage:create_azure_blob_storage_client",
+    "file": "faust_large_message_serializer.blob_storage.file_blob_storage:create_file_blob_storage_client",
+}
+_lock = Lock()
+
+
+def register_backend(scheme: str, factory: Union[str, BackendFactory]) -> None:
+    """Registers a factory, or the ``module:function`` path of one, for a scheme."""
+    with _lock:
+        _backends[scheme] = factory
+
+
+def get_backend(scheme: str) -> Optional[BackendFactory]:
+    # modules are imported without holding the lock, since they may register
+    # backends themselves when they are imported
+    with _lock:
+        registered = _backends.get(scheme)
+    backend = _find_entry_point(scheme) if registered is None else registered
+    if isinstance(backend, str):
+        backend = _load(backend)
+    if backend is None:
+        return None
+
+    with _lock:
+        current = _backends.get(scheme)
+        if current is registered:
+            _backends[scheme] = backend
+        elif callable(current):
+            # registered while loading, e.g. by the imported module
+            backend = current
+    return backend
+
+
+def _load(path: str) -> BackendFactory:
+    module_name, _, attribute = path.partition(":")
+    return getattr(import_module(module_name), attribute)
+
+
+def _find_entry_point(scheme: str) -> Optional[BackendFactory]:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # pragma: no cover
+        return None
+
+    all_entry_points = entry_points()
+    if hasattr(all_entry_points, "select"):
+        candidates = all_entry_points.select(group=ENTRY_POINT_GROUP, name=scheme)
+    else:  # pragma: no cover
+        candidates = [
+            entry_point
+            for entry_point in all_entry_points.get(ENTRY_POINT_GROUP, [])
+            if entry_point.name == scheme
+        ]
+    for entry_point in candidates:
+        return entry_point.load()
+    return None
@@ -0,0 +1,168 @@
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from loguru import logger
+
+from faust_large_message_serializer.blob_storage.blob_storage import (
+    BlobObject,
+    BlobStorageClient,
+)
+from faust_large_message_serializer.blob_storage.transfer import RetryPolicy
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    Instrumentation,
+)
+
+T = TypeVar("T")
+
+
+def _get_size_class(size: int) -> int:
+    # latencies are compared within powers of four of the blob size
+    return max(size, 1).bit_length() // 2
+
+
+class RetryingBlobStorageClient(BlobStorageClient):
+    """Retries failed requests of another client with exponential backoff.
+
+    Only errors the wrapped client considers retryable, e.g. throttling or
+    timeouts, are retried. If ``hedge_percentile`` is set, a second request of
+    ``get_sized_object`` is sent when the first one takes longer than that
+    percentile of recent downloads of similar size, and the first response wins.
+    Blobs of unknown size or larger than ``hedge_max_size`` are not hedged, since
+    their latency is dominated by the transfer and not by slow requests.
+    """
+
+    def __init__(
+        self,
+        client: BlobStorageClient,
+        retry_policy: Optional[RetryPolicy] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        hedge_window: int = 1000,
+        hedge_max_workers: int = 8,
+        hedge_max_size: int = 16 * 1000 * 1000,
+    ):
+        self._client = client
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._instrumentation = instrumentation or Instrumentation()
+        self._hedge_percentile = hedge_percentile
+        self._hedge_min_samples = hedge_min_samples
+        self._hedge_window = hedge_window
+        self._hedge_max_size = hedge_max_size
+        self._latencies: "Dict[int, deque[float]]" = {}
+        self._latencies_lock = Lock()
+        self._hedge_max_workers = hedge_max_workers
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_executor_lock = Lock()
+        self.MAX_DELETE_BATCH_SIZE = client.MAX_DELETE_BATCH_SIZE
+
+    def is_retryable(self, error: Exception) -> bool:
+        return self._client.is_retryable(error)
+
+    def delete_all_objects(self, bucket: str, prefix: str) -> None:
+        self.__retry(
+            "delete_all_objects", self._client.delete_all_objects, bucket, prefix
+        )
+
+    def put_object(self, data: bytes, bucket: str, key: str) -> str:
+        return self.__retry("put_object", self._client.put_object, data, bucket, key)
+
+    def put_object_stream(self, stream: BinaryIO, bucket: str, key: str) -> str:
+        # a partially consumed stream cannot be uploaded again
+        return self._client.put_object_stream(stream, bucket, key)
+
+    def get_object(self, bucket: str, key: str) -> bytes:
+        if self._hedge_percentile is None:
+            return self.__retry("get_object", self._client.get_object, bucket, key)
+        return self.__retry("get_object", self.__timed_get_object, bucket, key)
+
+    def get_sized_object(self, bucket: str, key: str, size: int) -> bytes:
+        if self._hedge_percentile is None or size > self._hedge_max_size:
+            return self.get_object(bucket, key)
+        return self.__retry("get_object", self.__get_object_hedged, bucket, key, size)
+
+    def get_object_range(self, bucket: str, key: str, start: int, end: int) -> bytes:
+        return self.__retry(
+            "get_object_range", self._client.get_object_range, bucket, key, start, end
+        )
+
+    def open_object(self, bucket: str, key: str) -> BinaryIO:
+        return self.__retry("open_object", self._client.open_object, bucket, key)
+
+    def object_exists(self, bucket: str, key: str) -> bool:
+        return self.__retry("object_exists", self._client.object_exists, bucket, key)
+
+    def list_objects(self, bucket: str, prefix: str) -> Iterator[BlobObject]:
+        return self._client.list_objects(bucket, prefix)
+
+    def delete_objects(self, bucket: str, objects: List[BlobObject]) -> int:
+        return self.__retry(
+            "delete_objects", self._client.delete_objects, bucket, objects
+        )
+
+    def __retry(self, operation: str, function: Callable[..., T], *args) -> T:
+        for attempt in range(self._retry_policy.max_attempts):
+            try:
+                return function(*args)
+            except Exception as e:
+                if (
+                    attempt + 1 == self._retry_policy.max_attempts
+                    or not self._client.is_retryable(e)
+                ):
+                    raise
+                logger.warning("Retrying {} after error: {}", operation, e)
+                self._instrumentation.on_retry(operation, attempt + 1, e)
+                time.sleep(self._retry_policy.get_delay(attempt))
+
+    def __get_object_hedged(self, bucket: str, key: str, size: int) -> bytes:
+        hedge_delay = self.__get_hedge_delay(size)
+        if hedge_delay is None:
+            return self.__timed_get_object(bucket, key)
+
+        executor = self.__get_hedge_executor()
+        pending = {executor.submit(self.__timed_get_object, bucket, key)}
+        done, _ = wait(pending, timeout=hedge_delay)
+        if not done:
+            self._instrumentation.on_hedge("get_object")
+            pending.add(executor.submit(self.__timed_get_object, bucket, key))
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def __timed_get_object(self, bucket: str, key: str) -> bytes:
+        start = time.perf_counter()
+        data = self._client.get_object(bucket, key)
+        seconds = time.perf_counter() - start
+        with self._latencies_lock:
+            latencies = self._latencies.setdefault(
+                _get_size_class(len(data)), deque(maxlen=self._hedge_window)
+            )
+            latencies.append(seconds)
+        return data
+
+    def __get_hedge_delay(self, size: int) -> Optional[float]:
+        with self._latencies_lock:
+            latencies = self._latencies.get(_get_size_class(size), ())
+            if len(latencies) < self._hedge_min_samples:
+                return None
+            latencies = sorted(latencies)
+        index = int(self._hedge_percentile / 100 * (len(latencies) - 1))
+        return latencies[index]
+
+    def __get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=self._hedge_max_workers,
+                    thread_name_prefix="large-message-hedge",
+                )
+            return self._hedge_executor
@@ -0,0 +1,42 @@
+"""Process-wide registry of SDK clients.
+
+boto3 and Azure clients own their connection pools, so serializers of
+different topics share one client per backend and credentials instead of
+opening a pool each.
+"""
+
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_clients: Dict[Hashable, Any] = {}
+_lock = Lock()
+
+
+def freeze(config: Dict[str, Any]) -> Optional[Hashable]:
+    """Returns a hashable key of a client config, or None if it has unhashable values."""
+    key = tuple(sorted(config.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def get_shared_client(key: Optional[Hashable], factory: Callable[[], T]) -> T:
+    """Returns the client created for the key, creating it on first use.
+
+    A key of None never matches, so the client is created but not shared.
+    """
+    if key is None:
+        return factory()
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def clear_shared_clients() -> None:
+    with _lock:
+        _clients.clear()
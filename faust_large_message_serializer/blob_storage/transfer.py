@@ -0,0 +1,206 @@
+import io
+import random
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 5.0
+
+    def get_delay(self, attempt: int) -> float:
+        # full jitter spreads the retries of concurrent clients after throttling
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+@dataclass
+class TransferConfig:
+    multipart_threshold: int = 64 * 1000 * 1000
+    part_size: int = 8 * 1000 * 1000
+    max_concurrency: int = 4
+    part_retries: int = 3
+    download_chunk_size: int = 8 * 1000 * 1000
+    download_max_concurrency: int = 4
+    part_retry_base_delay: float = 0.1
+    part_retry_max_delay: float = 5.0
+
+    def create_part_retry_policy(self) -> RetryPolicy:
+        return RetryPolicy(
+            self.part_retries + 1, self.part_retry_base_delay, self.part_retry_max_delay
+        )
+
+
+class TransferError(Exception):
+    """Raised when a part still fails after all of its retries.
+
+    It is not retryable, so that the whole transfer is not retried once more.
+    """
+
+
+def split_parts(size: int, part_size: int) -> List[Tuple[int, int]]:
+    return [
+        (start, min(start + part_size, size)) for start in range(0, size, part_size)
+    ]
+
+
+def transfer_parts(
+    parts: List[Tuple[int, int]],
+    transfer_part: Callable[[int, int, int], T],
+    max_concurrency: int,
+    retry_policy: RetryPolicy,
+    is_retryable: Callable[[Exception], bool],
+    on_retry: Optional[Callable[[int, Exception], None]] = None,
+) -> List[T]:
+    """Calls ``transfer_part(index, start, end)`` for every part with at most
+    ``max_concurrency`` parts in flight, retrying failed parts on their own.
+
+    Errors that are not retryable are raised at once, and parts that fail all
+    attempts raise a ``TransferError``."""
+
+    def transfer_with_retries(index: int) -> T:
+        start, end = parts[index]
+        for attempt in range(retry_policy.max_attempts):
+            try:
+                return transfer_part(index, start, end)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                if attempt + 1 == retry_policy.max_attempts:
+                    raise TransferError(
+                        f"Part {index} failed after {attempt + 1} attempts: {e}"
+                    ) from e
+                logger.warning("Retrying part {} after error: {}", index, e)
+                if on_retry is not None:
+                    on_retry(attempt + 1, e)
+                time.sleep(retry_policy.get_delay(attempt))
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return list(executor.map(transfer_with_retries, range(len(parts))))
+
+
+def read_into(stream, view: memoryview) -> None:
+    while view:
+        read = stream.readinto(view)
+        if not read:
+            raise IOError("Stream ended before the buffer was filled")
+        view = view[read:]
+
+
+def read_chunk(stream: BinaryIO, size: int) -> bytes:
+    """Reads ``size`` bytes, or less only if the stream ends."""
+    chunk = bytearray()
+    while len(chunk) < size:
+        data = stream.read(size - len(chunk))
+        if not data:
+            break
+        chunk += data
+    return bytes(chunk)
+
+
+def iter_windows(
+    data: bytes, stream: BinaryIO, part_size: int, window_size: int
+) -> Iterator[bytes]:
+    """Yields ``data`` followed by the rest of the stream in windows of whole parts.
+
+    Only the last window may end with a part smaller than ``part_size``, so every
+    window can be split into parts with ``split_parts``.
+    """
+    while True:
+        chunk = read_chunk(stream, window_size)
+        data = data + chunk if chunk else data
+        if len(chunk) < window_size:
+            yield data
+            return
+        end = len(data) // part_size * part_size
+        yield data[:end]
+        data = data[end:]
+
+
+class IteratorReader(io.RawIOBase):
+    """Readable stream over an iterator of chunks."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._chunk = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._chunk:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._chunk = memoryview(chunk)
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+
+class ChecksumReader(io.RawIOBase):
+    """Readable stream over ``head`` and the rest of ``stream`` that counts the
+    bytes read and, if enabled, computes their CRC-32."""
+
+    def __init__(self, head: bytes, stream: BinaryIO, checksum: bool = False):
+        self._head = memoryview(head)
+        self._stream = stream
+        self.size = 0
+        self.checksum = zlib.crc32(b"") if checksum else None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._head:
+            read = min(len(buffer), len(self._head))
+            buffer[:read] = self._head[:read]
+            self._head = self._head[read:]
+        else:
+            data = self._stream.read(len(buffer))
+            read = len(data)
+            buffer[:read] = data
+        self.size += read
+        if self.checksum is not None:
+            self.checksum = zlib.crc32(memoryview(buffer)[:read], self.checksum)
+        return read
+
+
+class BufferWriter(io.RawIOBase):
+    """Seekable writable stream that writes into a preallocated buffer."""
+
+    def __init__(self, buffer: Union[bytearray, memoryview]):
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = offset
+        return self._position
+
+    def write(self, data) -> int:
+        end = self._position + len(data)
+        self._view[self._position : end] = data
+        self._position = end
+        return len(data)
@@ -0,0 +1,10 @@
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+
+
+class BlobCache(ABC):
+
+    @abstractmethod
+    def get(self, uri: str) -> Optional[Union[bytes, memoryview]]: ...
+    @abstractmethod
+    def put(self, uri: str, data: bytes) -> None: ...
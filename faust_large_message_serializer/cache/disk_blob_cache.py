@@ -0,0 +1,121 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from threading import Lock
+from typing import Optional, List, Tuple
+
+from loguru import logger
+
+from faust_large_message_serializer.cache.blob_cache import BlobCache
+
+
+class DiskBlobCache(BlobCache):
+    """Size-capped cache of blobs in a local directory.
+
+    Blobs are written atomically, so several worker processes on one host can share
+    the same directory. Hits are memory mapped instead of being read into memory.
+    The least recently used files are evicted once ``max_bytes`` is exceeded.
+    Failing reads and writes, e.g. on a full disk, are logged and do not fail
+    retrievals.
+    """
+
+    TEMP_PREFIX = ".tmp-"
+    # evicts below the limit, so that the directory is not scanned on every put
+    LOW_WATER_MARK = 0.9
+
+    def __init__(self, directory: str, max_bytes: int):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self.__list_entries())
+
+    def get(self, uri: str) -> Optional[memoryview]:
+        path = self.__path(uri)
+        try:
+            with open(path, "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return memoryview(b"")
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read from disk cache {}: {}", self._directory, e)
+            return None
+        try:
+            os.utime(path)
+        except OSError as e:
+            # the hit is still valid, it is only evicted earlier
+            logger.debug("Could not touch {} in disk cache: {}", path, e)
+        return memoryview(mapped)
+
+    def put(self, uri: str, data: bytes) -> None:
+        if len(data) > self._max_bytes:
+            return
+        path = self.__path(uri)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(
+                prefix=self.TEMP_PREFIX, dir=os.path.dirname(path)
+            )
+        except OSError as e:
+            logger.warning("Could not write to disk cache {}: {}", self._directory, e)
+            return
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            self.__remove(temp_path)
+            logger.warning("Could not write to disk cache {}: {}", self._directory, e)
+            return
+        except BaseException:
+            self.__remove(temp_path)
+            raise
+        with self._lock:
+            self._size += len(data)
+            if self._size > self._max_bytes:
+                self.__evict()
+
+    def __remove(self, path: str) -> bool:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Could not remove {} from disk cache: {}", path, e)
+            return False
+        return True
+
+    def __path(self, uri: str) -> str:
+        digest = hashlib.sha256(uri.encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, digest[:2], digest)
+
+    def __list_entries(self) -> List[Tuple[float, str, int]]:
+        entries = []
+        for root, _, files in os.walk(self._directory):
+            for name in files:
+                if name.startswith(self.TEMP_PREFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def __evict(self) -> None:
+        # other processes may share the directory, so the size is recomputed from disk
+        entries = sorted(self.__list_entries())
+        self._size = sum(size for _, _, size in entries)
+        target_size = self._max_bytes * self.LOW_WATER_MARK
+        for _, path, size in entries:
+            if self._size <= target_size:
+                break
+            if self.__remove(path):
+                self._size -= size
+        logger.debug("Evicted blobs from disk cache {}", self._directory)
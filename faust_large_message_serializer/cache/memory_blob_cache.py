@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+
+from faust_large_message_serializer.cache.blob_cache import BlobCache
+
+
+class MemoryBlobCache(BlobCache):
+    """LRU cache of blobs bounded by the total size of the cached blobs.
+
+    Blob keys are never reused, so entries only leave the cache when they are
+    evicted or, if ``ttl`` is set, once they are older than ``ttl`` seconds.
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None):
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, uri: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(uri)
+            if entry is None:
+                return None
+            data, stored_at = entry
+            if self.__is_expired(stored_at):
+                self.__remove(uri)
+                return None
+            self._entries.move_to_end(uri)
+            return data
+
+    def put(self, uri: str, data: bytes) -> None:
+        if len(data) > self._max_bytes:
+            return
+        with self._lock:
+            if uri in self._entries:
+                self.__remove(uri)
+            self._entries[uri] = (data, time.monotonic())
+            self._size += len(data)
+            while self._size > self._max_bytes:
+                self.__remove(next(iter(self._entries)))
+
+    def __is_expired(self, stored_at: float) -> bool:
+        return self._ttl is not None and time.monotonic() - stored_at > self._ttl
+
+    def __remove(self, uri: str) -> None:
+        data, _ = self._entries.pop(uri)
+        self._size -= len(data)
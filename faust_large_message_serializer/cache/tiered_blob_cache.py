@@ -0,0 +1,23 @@
+from typing import Optional, List, Union
+
+from faust_large_message_serializer.cache.blob_cache import BlobCache
+
+
+class TieredBlobCache(BlobCache):
+    """Looks up blobs in the given caches in order, promoting hits to the faster tiers."""
+
+    def __init__(self, tiers: List[BlobCache]):
+        self._tiers = tiers
+
+    def get(self, uri: str) -> Optional[Union[bytes, memoryview]]:
+        for index, tier in enumerate(self._tiers):
+            data = tier.get(uri)
+            if data is not None:
+                for faster_tier in self._tiers[:index]:
+                    faster_tier.put(uri, data)
+                return data
+        return None
+
+    def put(self, uri: str, data: bytes) -> None:
+        for tier in self._tiers:
+            tier.put(uri, data)
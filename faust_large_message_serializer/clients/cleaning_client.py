@@ -0,0 +1,105 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Callable, Iterable, Optional, Set
+
+from loguru import logger
+
+from faust_large_message_serializer.blob_storage.blob_storage import (
+    BlobObject,
+    BlobStorageClient,
+    iter_batches,
+)
+from faust_large_message_serializer.utils.uri_parser import URIParser
+
+
+@dataclass
+class CleanupProgress:
+    listed: int = 0
+    deleted: int = 0
+    failed: int = 0
+
+
+class CleaningClient:
+    """Deletes the blobs of a topic in batches with parallel workers.
+
+    Listing is lazy and at most ``2 * max_workers`` batches are pending at a time,
+    so topics with millions of blobs are cleaned up with bounded memory.
+    """
+
+    def __init__(
+        self,
+        client: BlobStorageClient,
+        base_path: URIParser,
+        max_workers: int = 8,
+        progress: Optional[Callable[[CleanupProgress], None]] = None,
+    ):
+        self._client = client
+        self._base_path = base_path
+        self._max_workers = max_workers
+        self._progress = progress
+
+    def delete_all_objects(self, topic: str) -> CleanupProgress:
+        bucket, prefix = self.__get_topic_prefix(topic)
+        return self.__delete(bucket, self._client.list_objects(bucket, prefix))
+
+    def delete_objects_older_than(
+        self, topic: str, max_age: timedelta
+    ) -> CleanupProgress:
+        """Deletes the blobs that are older than ``max_age``, e.g. the retention of the topic."""
+        bucket, prefix = self.__get_topic_prefix(topic)
+        threshold = datetime.now(timezone.utc) - max_age
+        objects = (
+            blob
+            for blob in self._client.list_objects(bucket, prefix)
+            if self.__as_utc(blob.last_modified) < threshold
+        )
+        return self.__delete(bucket, objects)
+
+    def __get_topic_prefix(self, topic: str):
+        if not self._base_path:
+            raise ValueError("Base path must not be null")
+        _, bucket, path = self._base_path.parse_uri()
+        return bucket, "/".join(filter(None, [path, topic])) + "/"
+
+    @staticmethod
+    def __as_utc(timestamp: datetime) -> datetime:
+        if timestamp.tzinfo is None:
+            return timestamp.replace(tzinfo=timezone.utc)
+        return timestamp
+
+    def __delete(self, bucket: str, objects: Iterable[BlobObject]) -> CleanupProgress:
+        progress = CleanupProgress()
+        lock = Lock()
+
+        def delete_batch(batch):
+            try:
+                deleted = self._client.delete_objects(bucket, batch)
+            except Exception as e:
+                logger.warning("Could not delete {} blobs: {}", len(batch), e)
+                deleted = 0
+            with lock:
+                progress.deleted += deleted
+                progress.failed += len(batch) - deleted
+                if self._progress is not None:
+                    self._progress(
+                        CleanupProgress(
+                            progress.listed, progress.deleted, progress.failed
+                        )
+                    )
+
+        pending: Set[Future] = set()
+        with ThreadPoolExecutor(
+            max_workers=self._max_workers, thread_name_prefix="large-message-cleanup"
+        ) as executor:
+            for batch in iter_batches(objects, self._client.MAX_DELETE_BATCH_SIZE):
+                with lock:
+                    progress.listed += len(batch)
+                if len(pending) >= 2 * self._max_workers:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(executor.submit(delete_batch, batch))
+        logger.info(
+            "Deleted {} of {} blobs in {}", progress.deleted, progress.listed, bucket
+        )
+        return progress
@@ -1,7 +1,45 @@
-from typing import Optional
+import asyncio
+import io
+import time
+import zlib
+from collections import Counter, deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Optional,
+    List,
+    Sequence,
+    TypeVar,
+    Union,
+)
 from loguru import logger
 from faust_large_message_serializer.blob_storage.blob_storage import BlobStorageClient
-from faust_large_message_serializer.utils.uri_parser import URIParser
+from faust_large_message_serializer.cache.blob_cache import BlobCache
+from faust_large_message_serializer.compression.compressors import get_compressor_by_id
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    Instrumentation,
+)
+from faust_large_message_serializer.utils.delta import (
+    apply_delta,
+    decode_delta_payload,
+)
+from faust_large_message_serializer.utils.envelope import is_delta, parse_flag
+from faust_large_message_serializer.utils.pointer import BlobPointer, decode_pointer
+from faust_large_message_serializer.utils.process_offload import ProcessOffload
+from faust_large_message_serializer.utils.single_flight import SingleFlight
+
+T = TypeVar("T")
+Blob = Union[bytes, bytearray, memoryview]
+
+
+def _to_bytes(payload: Blob) -> bytes:
+    # views and bytearrays may be shared with the cache or a download buffer,
+    # so they are copied once, codecs expect bytes anyway
+    return payload if isinstance(payload, bytes) else bytes(payload)
 
 
 class RetrievingClient:
@@ -10,26 +48,256 @@ class RetrievingClient:
     KEY_PREFIX = "keys"
     IS_BACKED = b"\x01"
     IS_NOT_BACKED = b"\x00"
+    DEFAULT_MAX_WORKERS = 8
+    # decompressions per codec whose ratios are used to estimate the next one
+    DECOMPRESSION_RATIO_WINDOW = 32
 
-    def __init__(self, client: BlobStorageClient):
+    def __init__(
+        self,
+        client: BlobStorageClient,
+        executor: Optional[Executor] = None,
+        cache: Optional[BlobCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        topic: Optional[str] = None,
+        offload: Optional[ProcessOffload] = None,
+    ):
         self._client = client
+        self._executor = executor
+        self._cache = cache
+        self._instrumentation = instrumentation or Instrumentation()
+        self._topic = topic
+        self._offload = offload
+        self._single_flight = SingleFlight()
+        self._executor_lock = Lock()
+        # recent decompression ratios per codec, used to offload small payloads
+        # that decompress to large ones
+        self._decompression_ratios: "Dict[int, deque[float]]" = {}
+        self._decompression_ratios_lock = Lock()
 
     def retrieve_bytes(self, data: Optional[bytes]) -> Optional[bytes]:
         if data is None:
             return None
 
-        if data[0:1] == self.IS_NOT_BACKED:
-            return data[1:]
+        return _to_bytes(self.__retrieve_payload(data))
+
+    def retrieve_view(self, data: Optional[bytes]) -> Optional[memoryview]:
+        """Like ``retrieve_bytes``, but without copying inline and memory mapped
+        payloads. The view of an inline payload references ``data``."""
+        if data is None:
+            return None
+
+        return memoryview(self.__retrieve_payload(data))
+
+    def __retrieve_payload(
+        self, data: bytes, packs: Optional[Dict[str, Blob]] = None
+    ) -> Blob:
+        is_backed, codec_id = parse_flag(data[0])
+        with self._instrumentation.span("large_message.retrieve", topic=self._topic):
+            if is_backed:
+                payload = self.__retrieve_backed_bytes(data, packs)
+            else:
+                payload = memoryview(data)[1:]
+        self._instrumentation.on_retrieve(self._topic, len(payload), is_backed)
+
+        if codec_id:
+            payload = self.__decompress(codec_id, payload)
+        if is_delta(data[0]):
+            # the base is a full version, usually cached after the first delta
+            base_message, delta = decode_delta_payload(payload)
+            base = self.__retrieve_payload(base_message, packs)
+            return apply_delta(base, delta)
+        return payload
+
+    async def retrieve_bytes_async(
+        self, data: Optional[bytes], as_view: bool = False
+    ) -> Optional[Union[bytes, memoryview]]:
+        retrieve = self.retrieve_view if as_view else self.retrieve_bytes
+        if data is None or data[0:1] == self.IS_NOT_BACKED:
+            return retrieve(data)
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, retrieve, data)
+
+    def retrieve_many(
+        self, datas: Sequence[Optional[bytes]], as_view: bool = False
+    ) -> List[Optional[Union[bytes, memoryview]]]:
+        if not any(self.__is_backed(data) for data in datas):
+            retrieve = self.retrieve_view if as_view else self.retrieve_bytes
+            return [retrieve(data) for data in datas]
+
+        return self.__retrieve_many(self.__get_executor(), datas, as_view)
+
+    def __get_executor(self) -> Executor:
+        # created once, so that batches do not start threads of their own
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.DEFAULT_MAX_WORKERS,
+                    thread_name_prefix="large-message-io",
+                )
+            return self._executor
+
+    def __retrieve_many(
+        self, executor: Executor, datas: Sequence[Optional[bytes]], as_view: bool
+    ) -> List[Optional[Union[bytes, memoryview]]]:
+        packs = self.__download_shared_packs(executor, datas)
+
+        def retrieve(data: Optional[bytes]) -> Optional[Union[bytes, memoryview]]:
+            if data is None:
+                return None
+            payload = self.__retrieve_payload(data, packs)
+            if as_view:
+                return memoryview(payload)
+            return _to_bytes(payload)
+
+        return list(executor.map(retrieve, datas))
+
+    def __download_shared_packs(
+        self, executor: Executor, datas: Sequence[Optional[bytes]]
+    ) -> Dict[str, Blob]:
+        # packs referenced by several records of a batch are downloaded once
+        pointers = [decode_pointer(data) for data in datas if self.__is_backed(data)]
+        references = Counter(
+            pointer.uri for pointer in pointers if pointer.offset is not None
+        )
+        shared_packs = {
+            pointer.uri: pointer
+            for pointer in pointers
+            if references[pointer.uri] > 1
+            and (self._cache is None or self._cache.get(pointer.uri) is None)
+        }
+
+        def download_pack(pointer: BlobPointer) -> Blob:
+            pack = BlobPointer(pointer.uri, pointer.bucket, pointer.key)
+            return self._single_flight.do(pack.uri, lambda: self.__download(pack))
+
+        return dict(
+            zip(shared_packs, executor.map(download_pack, shared_packs.values()))
+        )
+
+    async def retrieve_many_async(
+        self, datas: Sequence[Optional[bytes]], as_view: bool = False
+    ) -> List[Optional[Union[bytes, memoryview]]]:
+        return list(
+            await asyncio.gather(
+                *(self.retrieve_bytes_async(data, as_view) for data in datas)
+            )
+        )
+
+    def retrieve_stream(self, data: Optional[bytes]) -> Optional[BinaryIO]:
+        """Returns the payload as a readable stream.
+
+        Uncompressed blobs that are not cached are streamed from blob storage,
+        so they are never held in memory completely. Their size and checksum are
+        not verified.
+        """
+        if data is None:
+            return None
+
+        is_backed, codec_id = parse_flag(data[0])
+        pointer = decode_pointer(data) if is_backed else None
+        if not is_backed or codec_id or is_delta(data[0]) or pointer.offset is not None:
+            return io.BytesIO(self.retrieve_bytes(data))
+
+        if self._cache is not None:
+            cached_data = self._cache.get(pointer.uri)
+            if cached_data is not None:
+                self._instrumentation.on_cache_hit(self._topic)
+                return io.BytesIO(cached_data)
+            self._instrumentation.on_cache_miss(self._topic)
+        with self._instrumentation.span(
+            "large_message.download", topic=self._topic, uri=pointer.uri
+        ):
+            stream = self._client.open_object(pointer.bucket, pointer.key)
+        logger.debug("Streaming large message from blob storage: {}", pointer.uri)
+        return stream
+
+    def __decompress(self, codec_id: int, payload: Blob) -> bytes:
+        decompress = get_compressor_by_id(codec_id).decompress
+        if self._offload is None or not payload:
+            return decompress(payload)
+        with self._decompression_ratios_lock:
+            # the largest recent ratio, so that one very compressible payload
+            # does not send all later payloads of the codec to the pool
+            ratio = max(self._decompression_ratios.get(codec_id, ()), default=1.0)
+        decompressed = self._offload.run(
+            decompress, payload, expected_size=int(len(payload) * ratio)
+        )
+        with self._decompression_ratios_lock:
+            self._decompression_ratios.setdefault(
+                codec_id, deque(maxlen=self.DECOMPRESSION_RATIO_WINDOW)
+            ).append(len(decompressed) / len(payload))
+        return decompressed
+
+    def __transform(self, function: Callable[..., T], data: bytes, *args) -> T:
+        if self._offload is None:
+            return function(data, *args)
+        return self._offload.run(function, data, *args)
+
+    def __is_backed(self, data: Optional[bytes]) -> bool:
+        return data is not None and parse_flag(data[0])[0]
+
+    def __retrieve_backed_bytes(
+        self, data: bytes, packs: Optional[Dict[str, Blob]] = None
+    ) -> Blob:
+        pointer = decode_pointer(data)
+        if pointer.offset is not None:
+            pack = self.__get_loaded_pack(pointer, packs)
+            if pack is not None:
+                blob_data = memoryview(pack)[
+                    pointer.offset : pointer.offset + pointer.size
+                ]
+                pointer.verify(blob_data, partial(self.__transform, zlib.crc32))
+                return blob_data
 
-        if data[0:1] != self.IS_BACKED:
-            raise ValueError("Message can only be marked as backed or non-backed")
+        if self._cache is not None:
+            cached_data = self._cache.get(pointer.cache_key)
+            if cached_data is not None:
+                self._instrumentation.on_cache_hit(self._topic)
+                logger.debug(
+                    "Extracted large message from cache: {}", pointer.cache_key
+                )
+                return cached_data
+            self._instrumentation.on_cache_miss(self._topic)
+        return self._single_flight.do(
+            pointer.cache_key, lambda: self.__download(pointer)
+        )
 
-        return self.__retrieve_backed_bytes(data)
+    def __get_loaded_pack(
+        self, pointer: BlobPointer, packs: Optional[Dict[str, Blob]]
+    ) -> Optional[Blob]:
+        if packs and pointer.uri in packs:
+            return packs[pointer.uri]
+        if self._cache is not None:
+            pack = self._cache.get(pointer.uri)
+            if pack is not None:
+                self._instrumentation.on_cache_hit(self._topic)
+            return pack
+        return None
 
-    def __retrieve_backed_bytes(self, data: bytes) -> bytes:
-        uri = data[1:].decode()
-        uri_parser = URIParser(uri)
-        _, bucket, key = uri_parser.parse_uri()
-        blob_data = self._client.get_object(bucket, key)
-        logger.debug("Extracted large message from blob storage: {}", uri_parser)
+    def __download(self, pointer: BlobPointer) -> Blob:
+        with self._instrumentation.span(
+            "large_message.download", topic=self._topic, uri=pointer.cache_key
+        ):
+            start = time.perf_counter()
+            if pointer.size is None:
+                blob_data = self._client.get_object(pointer.bucket, pointer.key)
+            elif pointer.offset is None:
+                blob_data = self._client.get_sized_object(
+                    pointer.bucket, pointer.key, pointer.size
+                )
+            else:
+                blob_data = self._client.get_object_range(
+                    pointer.bucket,
+                    pointer.key,
+                    pointer.offset,
+                    pointer.offset + pointer.size,
+                )
+            self._instrumentation.on_download(
+                self._topic, len(blob_data), time.perf_counter() - start
+            )
+        pointer.verify(blob_data, partial(self.__transform, zlib.crc32))
+        logger.debug("Extracted large message from blob storage: {}", pointer.cache_key)
+        if self._cache is not None:
+            self._cache.put(pointer.cache_key, blob_data)
         return blob_data
@@ -1,11 +1,60 @@
-from typing import Union, Optional
+import asyncio
+import hashlib
+import io
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Executor
+from threading import Lock
+from typing import (
+    BinaryIO,
+    Callable,
+    Hashable,
+    List,
+    NamedTuple,
+    Sequence,
+    TypeVar,
+    Union,
+    Optional,
+    Tuple,
+)
 from uuid import uuid4
 
 from loguru import logger
 
 from faust_large_message_serializer.blob_storage.blob_storage import BlobStorageClient
+from faust_large_message_serializer.blob_storage.transfer import (
+    ChecksumReader,
+    read_chunk,
+)
+from faust_large_message_serializer.compression.compressor import Compressor
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    Instrumentation,
+)
+from faust_large_message_serializer.utils.delta import (
+    create_delta,
+    encode_delta_payload,
+)
+from faust_large_message_serializer.utils.envelope import create_flag, parse_flag
+from faust_large_message_serializer.utils.pointer import (
+    BLOB_ID_LENGTH,
+    encode_pointer,
+    format_blob_id,
+)
+from faust_large_message_serializer.utils.process_offload import (
+    ProcessOffload,
+    content_hash,
+)
 from faust_large_message_serializer.utils.uri_parser import URIParser
 
+T = TypeVar("T")
+
+
+class DeltaBase(NamedTuple):
+    data: bytes
+    message: bytes
+    versions: int
+
 
 class StoringClient:
 
@@ -13,44 +62,379 @@ class StoringClient:
     KEY_PREFIX = "keys"
     IS_BACKED = b"\x01"
     IS_NOT_BACKED = b"\x00"
+    # deltas larger than this share of the payload are stored as full versions
+    MAX_DELTA_RATIO = 0.5
 
-    def __init__(self, client: BlobStorageClient, base_path: URIParser, max_size: int):
+    def __init__(
+        self,
+        client: BlobStorageClient,
+        base_path: URIParser,
+        max_size: int,
+        executor: Optional[Executor] = None,
+        content_addressed: bool = False,
+        uploaded_index_size: int = 100000,
+        compressor: Optional[Compressor] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        key_shards: int = 0,
+        compact_pointers: bool = False,
+        pointer_checksums: bool = False,
+        offload: Optional[ProcessOffload] = None,
+        pack_max_bytes: int = 0,
+        delta_snapshot_interval: int = 0,
+        delta_max_bytes: int = 256 * 1000 * 1000,
+    ):
         self._client = client
         self._base_path = base_path
+        self._parsed_base_path = base_path.parse_uri() if base_path else None
         self._max_size = max_size
+        self._executor = executor
+        self._content_addressed = content_addressed
+        self._uploaded_index_size = uploaded_index_size
+        self._uploaded_index: "OrderedDict[str, None]" = OrderedDict()
+        self._uploaded_index_lock = Lock()
+        self._compressor = compressor
+        self._instrumentation = instrumentation or Instrumentation()
+        self._key_shards = key_shards
+        self._key_shard_width = len(f"{max(key_shards - 1, 0):x}")
+        self._compact_pointers = compact_pointers
+        self._pointer_checksums = pointer_checksums
+        self._offload = offload
+        self._pack_max_bytes = pack_max_bytes
+        self._delta_snapshot_interval = delta_snapshot_interval
+        self._delta_max_bytes = delta_max_bytes
+        self._delta_bases: "OrderedDict[Hashable, DeltaBase]" = OrderedDict()
+        self._delta_bases_bytes = 0
+        self._delta_bases_lock = Lock()
 
     def store_bytes(
-        self, topic: str, data: Optional[bytes], is_key: bool
+        self,
+        topic: str,
+        data: Optional[bytes],
+        is_key: bool,
+        record_key: Optional[bytes] = None,
     ) -> Optional[bytes]:
+        """Stores a payload and returns the message to produce.
+
+        If delta encoding is enabled and the ``record_key`` of a changelog record
+        is given, the payload may be stored as a delta against the last full
+        version of that key.
+        """
         if data is None:
             return None
+        if record_key is not None and self._delta_snapshot_interval > 0:
+            return self.__store_delta(topic, data, is_key, record_key)
+        return self.__store_payload(topic, data, is_key)
+
+    def __store_payload(
+        self, topic: str, data: bytes, is_key: bool, is_delta: bool = False
+    ) -> bytes:
+        with self._instrumentation.span("large_message.store", topic=topic):
+            data, codec_id = self.__compress(data)
+            is_backed = self.needs_backing(data)
+            self._instrumentation.on_store(topic, len(data), is_backed)
+            if is_backed:
+                return self.__store_backed_bytes(
+                    topic, is_key, data, codec_id, is_delta
+                )
+            else:
+                return self.__serialize(
+                    data, create_flag(False, codec_id, is_delta=is_delta)
+                )
 
-        if self.__needs_backing(data):
-            key = self.__create_blob_storage_key(topic, is_key)
-            uri = self.__upload_to_blob_storage(key, data)
-            return self.__serialize(uri, self.IS_BACKED)
+    def __store_delta(
+        self, topic: str, data: bytes, is_key: bool, record_key: bytes
+    ) -> bytes:
+        # deltas always reference the last full version, so reading a message
+        # needs at most one additional blob
+        base_key = (topic, is_key, record_key)
+        base = self.__get_delta_base(base_key)
+        if base is not None and base.versions < self._delta_snapshot_interval:
+            # not offloaded, since both versions would have to be passed to the
+            # worker, while the scan stops early for payloads that changed a lot
+            delta = create_delta(base.data, data, int(len(data) * self.MAX_DELTA_RATIO))
+            if delta is not None:
+                message = self.__store_payload(
+                    topic, encode_delta_payload(base.message, delta), is_key, True
+                )
+                self.__put_delta_base(
+                    base_key, base._replace(versions=base.versions + 1)
+                )
+                return message
+
+        message = self.__store_payload(topic, data, is_key)
+        if parse_flag(message[0])[0]:
+            self.__put_delta_base(base_key, DeltaBase(bytes(data), message, 0))
         else:
-            return self.__serialize(data, self.IS_NOT_BACKED)
+            self.__put_delta_base(base_key, None)
+        return message
+
+    def __get_delta_base(self, base_key: Hashable) -> Optional[DeltaBase]:
+        with self._delta_bases_lock:
+            base = self._delta_bases.get(base_key)
+            if base is not None:
+                self._delta_bases.move_to_end(base_key)
+            return base
+
+    def __put_delta_base(self, base_key: Hashable, base: Optional[DeltaBase]) -> None:
+        with self._delta_bases_lock:
+            previous = self._delta_bases.pop(base_key, None)
+            if previous is not None:
+                self._delta_bases_bytes -= len(previous.data)
+            if base is None or len(base.data) > self._delta_max_bytes:
+                return
+            self._delta_bases[base_key] = base
+            self._delta_bases_bytes += len(base.data)
+            while self._delta_bases_bytes > self._delta_max_bytes:
+                _, evicted = self._delta_bases.popitem(last=False)
+                self._delta_bases_bytes -= len(evicted.data)
+
+    def store_many(
+        self, topic: str, datas: Sequence[Optional[bytes]], is_key: bool
+    ) -> List[Optional[bytes]]:
+        """Stores a batch of payloads, e.g. the records of one producer batch.
 
-    def __create_blob_storage_key(self, topic: str, is_key: bool) -> str:
-        if not self._base_path:
+        If packing is enabled, backed payloads of the batch are packed into
+        shared blobs of up to ``pack_max_bytes`` bytes, so that only one object
+        is uploaded per pack. Their records point to a byte range of the pack.
+        """
+        if self._pack_max_bytes <= 0:
+            return [self.store_bytes(topic, data, is_key) for data in datas]
+
+        results: List[Optional[bytes]] = [None] * len(datas)
+        pack: List[Tuple[int, bytes, int]] = []
+        pack_size = 0
+        with self._instrumentation.span("large_message.store", topic=topic):
+            for index, data in enumerate(datas):
+                if data is None:
+                    continue
+                data, codec_id = self.__compress(data)
+                is_backed = self.needs_backing(data)
+                self._instrumentation.on_store(topic, len(data), is_backed)
+                if not is_backed:
+                    results[index] = self.__serialize(
+                        data, create_flag(False, codec_id)
+                    )
+                    continue
+                if pack and pack_size + len(data) > self._pack_max_bytes:
+                    self.__store_pack(topic, is_key, pack, results)
+                    pack, pack_size = [], 0
+                pack.append((index, data, codec_id))
+                pack_size += len(data)
+            if pack:
+                self.__store_pack(topic, is_key, pack, results)
+        return results
+
+    def __store_pack(
+        self,
+        topic: str,
+        is_key: bool,
+        pack: List[Tuple[int, bytes, int]],
+        results: List[Optional[bytes]],
+    ) -> None:
+        if len(pack) == 1:
+            index, data, codec_id = pack[0]
+            results[index] = self.__store_backed_bytes(topic, is_key, data, codec_id)
+            return
+
+        blob_id = uuid4().bytes
+        key = self.__create_blob_storage_key(
+            topic, is_key, format_blob_id(blob_id, False)
+        )
+        self.__upload_to_blob_storage(
+            topic, key, b"".join(data for _, data, _ in pack), False
+        )
+        offset = 0
+        for index, data, codec_id in pack:
+            results[index] = create_flag(True, codec_id, True) + self.__create_pointer(
+                key,
+                blob_id,
+                False,
+                len(data),
+                self.__create_checksum(data),
+                offset,
+            )
+            offset += len(data)
+
+    def __store_backed_bytes(
+        self,
+        topic: str,
+        is_key: bool,
+        data: bytes,
+        codec_id: int,
+        is_delta: bool = False,
+    ) -> bytes:
+        blob_id = self.__create_blob_id(data)
+        key = self.__create_blob_storage_key(
+            topic, is_key, format_blob_id(blob_id, self._content_addressed)
+        )
+        uri = self.__upload_to_blob_storage(topic, key, data, self._content_addressed)
+        if self._compact_pointers:
+            return create_flag(True, codec_id, True, is_delta) + self.__create_pointer(
+                key,
+                blob_id,
+                self._content_addressed,
+                len(data),
+                self.__create_checksum(data),
+            )
+        return self.__serialize(uri, create_flag(True, codec_id, is_delta=is_delta))
+
+    def __create_checksum(self, data: bytes) -> Optional[int]:
+        if not self._pointer_checksums:
+            return None
+        return self.__transform(zlib.crc32, data)
+
+    async def store_bytes_async(
+        self,
+        topic: str,
+        data: Optional[bytes],
+        is_key: bool,
+        record_key: Optional[bytes] = None,
+    ) -> Optional[bytes]:
+        if not self.needs_backing(data):
+            return self.store_bytes(topic, data, is_key, record_key)
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor, self.store_bytes, topic, data, is_key, record_key
+        )
+
+    def store_stream(
+        self, topic: str, stream: Optional[BinaryIO], is_key: bool
+    ) -> Optional[bytes]:
+        """Stores a payload read from a stream without holding all of it in memory.
+
+        Payloads up to the max size are stored like with ``store_bytes``. Larger
+        ones are uploaded in parts while reading and are neither compressed nor
+        content addressed.
+        """
+        if stream is None:
+            return None
+
+        head = read_chunk(stream, self._max_size + 1)
+        if not self.needs_backing(head):
+            return self.store_bytes(topic, head, is_key)
+
+        with self._instrumentation.span("large_message.store", topic=topic):
+            blob_id = uuid4().bytes
+            key = self.__create_blob_storage_key(
+                topic, is_key, format_blob_id(blob_id, False)
+            )
+            reader = ChecksumReader(head, stream, self._pointer_checksums)
+            _, bucket, _ = self._parsed_base_path
+            with self._instrumentation.span("large_message.upload", topic=topic):
+                start = time.perf_counter()
+                uri = self._client.put_object_stream(
+                    io.BufferedReader(reader), bucket, key
+                )
+                self._instrumentation.on_upload(
+                    topic, reader.size, time.perf_counter() - start
+                )
+            self._instrumentation.on_store(topic, reader.size, True)
+            logger.debug("Stored large message on blob storage: {}", uri)
+            if self._compact_pointers:
+                return create_flag(True, 0, True) + self.__create_pointer(
+                    key, blob_id, False, reader.size, reader.checksum
+                )
+            return self.__serialize(uri, create_flag(True))
+
+    def __create_blob_id(self, data: bytes) -> bytes:
+        if self._content_addressed:
+            return self.__transform(content_hash, data, BLOB_ID_LENGTH)
+        return uuid4().bytes
+
+    def __create_blob_storage_key(self, topic: str, is_key: bool, blob_id: str) -> str:
+        if not self._parsed_base_path:
             raise ValueError("Base path must not be null")
         prefix = self.KEY_PREFIX if is_key else self.VALUE_PREFIX
-        schema, bucket, path = self._base_path.parse_uri()
-        random_id = str(uuid4())
-        storage_accumulated_path = [path, topic, prefix, random_id]
+        _, _, path = self._parsed_base_path
+        storage_accumulated_path = [
+            path,
+            topic,
+            prefix,
+            self.__get_key_shard(blob_id),
+            blob_id,
+        ]
         storage_path = "/".join(filter(None, storage_accumulated_path))
         return storage_path
 
-    def __needs_backing(self, data: bytes) -> bool:
-        return len(data) > self._max_size
+    def __get_key_shard(self, blob_id: str) -> Optional[str]:
+        # S3 scales request rates per prefix, so keys are spread over shards
+        if self._key_shards <= 1:
+            return None
+        digest = hashlib.blake2b(blob_id.encode(), digest_size=8).digest()
+        shard = int.from_bytes(digest, "big") % self._key_shards
+        return f"{shard:0{self._key_shard_width}x}"
+
+    def __compress(self, data: bytes) -> Tuple[bytes, int]:
+        if self._compressor is None:
+            return data, 0
+        compressed = self.__transform(self._compressor.compress, data)
+        if len(compressed) >= len(data):
+            return data, 0
+        return compressed, self._compressor.CODEC_ID
+
+    def __transform(self, function: Callable[..., T], data: bytes, *args) -> T:
+        if self._offload is None:
+            return function(data, *args)
+        return self._offload.run(function, data, *args)
 
-    def __upload_to_blob_storage(self, key: str, data: bytes) -> str:
-        _, bucket, _ = self._base_path.parse_uri()
-        uri = self._client.put_object(data, bucket, key)
+    def needs_backing(self, data: Optional[bytes]) -> bool:
+        return data is not None and len(data) > self._max_size
+
+    def __create_pointer(
+        self,
+        key: str,
+        blob_id: bytes,
+        is_content_hash: bool,
+        size: int,
+        checksum: Optional[int],
+        offset: Optional[int] = None,
+    ) -> bytes:
+        schema, bucket, _ = self._parsed_base_path
+        directory = key[: key.rindex("/") + 1]
+        return encode_pointer(
+            f"{schema}://{bucket}/{directory}".encode("utf-8"),
+            blob_id,
+            is_content_hash,
+            size,
+            checksum,
+            offset,
+        )
+
+    def __upload_to_blob_storage(
+        self, topic: str, key: str, data: bytes, content_addressed: bool
+    ) -> str:
+        schema, bucket, _ = self._parsed_base_path
+        if content_addressed:
+            uri = f"{schema}://{bucket}/{key}"
+            if self.__is_uploaded(uri) or self._client.object_exists(bucket, key):
+                self.__mark_uploaded(uri)
+                logger.debug("Large message already on blob storage: {}", uri)
+                return uri
+        with self._instrumentation.span(
+            "large_message.upload", topic=topic, size=len(data)
+        ):
+            start = time.perf_counter()
+            uri = self._client.put_object(data, bucket, key)
+            self._instrumentation.on_upload(
+                topic, len(data), time.perf_counter() - start
+            )
         logger.debug("Stored large message on blob storage: {}", uri)
+        if content_addressed:
+            self.__mark_uploaded(uri)
         return uri
 
+    def __is_uploaded(self, uri: str) -> bool:
+        with self._uploaded_index_lock:
+            return uri in self._uploaded_index
+
+    def __mark_uploaded(self, uri: str) -> None:
+        with self._uploaded_index_lock:
+            self._uploaded_index[uri] = None
+            self._uploaded_index.move_to_end(uri)
+            while len(self._uploaded_index) > self._uploaded_index_size:
+                self._uploaded_index.popitem(last=False)
+
     def __serialize(self, uri: Union[bytes, str], flag: bytes) -> bytes:
-        data_bytes = uri if isinstance(uri, bytes) else uri.encode("utf-8")
+        data_bytes = uri.encode("utf-8") if isinstance(uri, str) else uri
         return flag + data_bytes
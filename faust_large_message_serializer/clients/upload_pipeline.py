@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from threading import Condition
+from typing import Optional
+
+from faust_large_message_serializer.clients.storing_client import StoringClient
+
+
+class UploadPipeline:
+    """Overlaps the uploads of backed messages.
+
+    ``submit`` returns a future of the serialized message that completes once the blob
+    is stored, so the message can be sent to Kafka afterwards. Submitting blocks while
+    ``max_in_flight_bytes`` or ``max_in_flight_uploads`` would be exceeded.
+    """
+
+    def __init__(
+        self,
+        storing_client: StoringClient,
+        executor: Executor,
+        max_in_flight_bytes: int,
+        max_in_flight_uploads: int,
+    ):
+        self._storing_client = storing_client
+        self._executor = executor
+        self._max_in_flight_bytes = max_in_flight_bytes
+        self._max_in_flight_uploads = max_in_flight_uploads
+        self._in_flight_bytes = 0
+        self._in_flight_uploads = 0
+        self._condition = Condition()
+
+    @property
+    def in_flight_bytes(self) -> int:
+        return self._in_flight_bytes
+
+    @property
+    def in_flight_uploads(self) -> int:
+        return self._in_flight_uploads
+
+    def submit(
+        self, topic: str, data: Optional[bytes], is_key: bool = False
+    ) -> "Future[Optional[bytes]]":
+        if not self._storing_client.needs_backing(data):
+            future = Future()
+            future.set_result(self._storing_client.store_bytes(topic, data, is_key))
+            return future
+
+        self.__acquire(len(data))
+        try:
+            future = self._executor.submit(
+                self._storing_client.store_bytes, topic, data, is_key
+            )
+        except BaseException:
+            self.__release(len(data))
+            raise
+        future.add_done_callback(lambda _: self.__release(len(data)))
+        return future
+
+    async def submit_async(
+        self, topic: str, data: Optional[bytes], is_key: bool = False
+    ) -> "asyncio.Future[Optional[bytes]]":
+        if not self._storing_client.needs_backing(data):
+            return asyncio.wrap_future(self.submit(topic, data, is_key))
+
+        loop = asyncio.get_event_loop()
+        # waiting for capacity must not block the event loop
+        future = await loop.run_in_executor(None, self.submit, topic, data, is_key)
+        return asyncio.wrap_future(future)
+
+    def __acquire(self, size: int) -> None:
+        with self._condition:
+            # a single message larger than the byte budget is uploaded on its own
+            self._condition.wait_for(
+                lambda: self._in_flight_uploads == 0
+                or (
+                    self._in_flight_uploads < self._max_in_flight_uploads
+                    and self._in_flight_bytes + size <= self._max_in_flight_bytes
+                )
+            )
+            self._in_flight_bytes += size
+            self._in_flight_uploads += 1
+
+    def __release(self, size: int) -> None:
+        with self._condition:
+            self._in_flight_bytes -= size
+            self._in_flight_uploads -= 1
+            self._condition.notify_all()
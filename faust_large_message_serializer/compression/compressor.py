@@ -0,0 +1,12 @@
+from abc import ABC, abstractmethod
+
+
+class Compressor(ABC):
+
+    CODEC_ID: int
+    NAME: str
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes: ...
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes: ...
@@ -0,0 +1,34 @@
+from typing import Dict, Optional, Type
+
+from faust_large_message_serializer.compression.compressor import Compressor
+from faust_large_message_serializer.compression.lz4_compressor import Lz4Compressor
+from faust_large_message_serializer.compression.lzma_compressor import LzmaCompressor
+from faust_large_message_serializer.compression.zlib_compressor import ZlibCompressor
+from faust_large_message_serializer.compression.zstd_compressor import ZstdCompressor
+
+COMPRESSORS: Dict[str, Type[Compressor]] = {
+    compressor.NAME: compressor
+    for compressor in (ZlibCompressor, LzmaCompressor, ZstdCompressor, Lz4Compressor)
+}
+
+_compressors_by_id: Dict[int, Compressor] = {}
+
+
+def create_compressor(name: str, level: Optional[int] = None) -> Compressor:
+    try:
+        return COMPRESSORS[name](level)
+    except KeyError as e:
+        raise ValueError(f"The compression {name} is not supported") from e
+
+
+def get_compressor_by_id(codec_id: int) -> Compressor:
+    compressor = _compressors_by_id.get(codec_id)
+    if compressor is None:
+        for compressor_type in COMPRESSORS.values():
+            if compressor_type.CODEC_ID == codec_id:
+                compressor = compressor_type()
+                break
+        else:
+            raise ValueError(f"Unknown compression codec {codec_id}")
+        _compressors_by_id[codec_id] = compressor
+    return compressor
@@ -0,0 +1,25 @@
+from typing import Optional
+
+from faust_large_message_serializer.compression.compressor import Compressor
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover
+    lz4 = None
+
+
+class Lz4Compressor(Compressor):
+
+    CODEC_ID = 4
+    NAME = "lz4"
+
+    def __init__(self, level: Optional[int] = None):
+        if lz4 is None:
+            raise ImportError("lz4 compression requires the lz4 package")
+        self._level = 0 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4.frame.compress(data, compression_level=self._level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4.frame.decompress(data)
@@ -0,0 +1,19 @@
+import lzma
+from typing import Optional
+
+from faust_large_message_serializer.compression.compressor import Compressor
+
+
+class LzmaCompressor(Compressor):
+
+    CODEC_ID = 2
+    NAME = "lzma"
+
+    def __init__(self, level: Optional[int] = None):
+        self._level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return lzma.compress(data, preset=self._level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lzma.decompress(data)
@@ -0,0 +1,19 @@
+import zlib
+from typing import Optional
+
+from faust_large_message_serializer.compression.compressor import Compressor
+
+
+class ZlibCompressor(Compressor):
+
+    CODEC_ID = 1
+    NAME = "zlib"
+
+    def __init__(self, level: Optional[int] = None):
+        self._level = zlib.Z_DEFAULT_COMPRESSION if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self._level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
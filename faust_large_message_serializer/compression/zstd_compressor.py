@@ -0,0 +1,25 @@
+from typing import Optional
+
+from faust_large_message_serializer.compression.compressor import Compressor
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class ZstdCompressor(Compressor):
+
+    CODEC_ID = 3
+    NAME = "zstd"
+
+    def __init__(self, level: Optional[int] = None):
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        self._level = 3 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=self._level).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zstandard.ZstdDecompressor().decompress(data)
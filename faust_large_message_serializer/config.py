@@ -1,19 +1,33 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional, Callable, Dict, Union
+from typing import Optional, Callable, Dict, Tuple, Union
 
-import boto3
-from azure.storage.blob import BlobServiceClient
-
-from faust_large_message_serializer.blob_storage.amazon_blob_storage import (
-    AmazonS3Client,
-)
-from faust_large_message_serializer.blob_storage.azure_blob_storage import (
-    AzureBlobStorageClient,
-)
 from faust_large_message_serializer.blob_storage.blob_storage import BlobStorageClient
+from faust_large_message_serializer.blob_storage.buffer_pool import BufferPool
 from faust_large_message_serializer.blob_storage.empty_blob import EmptyBlobStorage
+from faust_large_message_serializer.blob_storage.registry import get_backend
+from faust_large_message_serializer.blob_storage.retrying_blob_storage import (
+    RetryingBlobStorageClient,
+    RetryPolicy,
+)
+from faust_large_message_serializer.blob_storage.transfer import TransferConfig
+from faust_large_message_serializer.cache.blob_cache import BlobCache
+from faust_large_message_serializer.cache.disk_blob_cache import DiskBlobCache
+from faust_large_message_serializer.cache.memory_blob_cache import MemoryBlobCache
+from faust_large_message_serializer.cache.tiered_blob_cache import TieredBlobCache
+from faust_large_message_serializer.clients.cleaning_client import (
+    CleaningClient,
+    CleanupProgress,
+)
 from faust_large_message_serializer.clients.retrieving_client import RetrievingClient
 from faust_large_message_serializer.clients.storing_client import StoringClient
+from faust_large_message_serializer.clients.upload_pipeline import UploadPipeline
+from faust_large_message_serializer.compression.compressor import Compressor
+from faust_large_message_serializer.compression.compressors import create_compressor
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    Instrumentation,
+)
+from faust_large_message_serializer.utils.process_offload import ProcessOffload
 from faust_large_message_serializer.utils.uri_parser import URIParser
 
 
@@ -29,6 +43,46 @@ class LargeMessageSerializerConfig:
     large_message_blob_storage_custom_config: Optional[
         Callable[[Dict[str, Optional[str]]], None]
     ] = None
+    large_message_io_max_workers: int = 8
+    large_message_cache_max_bytes: int = 0
+    large_message_cache_ttl: Optional[float] = None
+    large_message_disk_cache_dir: Optional[str] = None
+    large_message_disk_cache_max_bytes: int = 1000 * 1000 * 1000
+    large_message_content_addressed: bool = False
+    large_message_uploaded_index_size: int = 100000
+    large_message_compression: Optional[str] = None
+    large_message_compression_level: Optional[int] = None
+    large_message_multipart_threshold: int = 64 * 1000 * 1000
+    large_message_multipart_part_size: int = 8 * 1000 * 1000
+    large_message_transfer_max_concurrency: int = 4
+    large_message_transfer_part_retries: int = 3
+    large_message_download_chunk_size: int = 8 * 1000 * 1000
+    large_message_download_max_concurrency: int = 4
+    large_message_max_in_flight_bytes: int = 256 * 1000 * 1000
+    large_message_max_in_flight_uploads: int = 8
+    large_message_instrumentation: Optional[Instrumentation] = None
+    large_message_share_clients: bool = True
+    large_message_max_pool_connections: int = 50
+    large_message_connect_timeout: float = 60
+    large_message_read_timeout: float = 60
+    large_message_tcp_keepalive: bool = False
+    large_message_cleanup_max_workers: int = 8
+    large_message_key_shards: int = 0
+    large_message_compact_pointers: bool = False
+    large_message_pointer_checksums: bool = False
+    large_message_zero_copy_loads: bool = False
+    large_message_retry_attempts: int = 1
+    large_message_retry_base_delay: float = 0.1
+    large_message_retry_max_delay: float = 5.0
+    large_message_hedge_percentile: Optional[float] = None
+    large_message_hedge_max_size: int = 16 * 1000 * 1000
+    large_message_process_pool_workers: int = 0
+    large_message_process_offload_threshold: int = 4 * 1000 * 1000
+    large_message_pack_max_bytes: int = 0
+    large_message_delta_snapshot_interval: int = 0
+    large_message_delta_max_bytes: int = 256 * 1000 * 1000
+    large_message_buffer_pool_size: int = 0
+    large_message_buffer_pool_max_buffer_bytes: int = 64 * 1000 * 1000
 
     def __post_init__(self):
         self.base_path = (
@@ -37,12 +91,14 @@ class LargeMessageSerializerConfig:
             else self.base_path
         )
 
-        self._factory_client = {
-            AmazonS3Client.PROTOCOL: self.__create_s3_client,
-            AzureBlobStorageClient.PROTOCOL: self.__create_azure_blob_storage_client,
-        }
+        # overrides the registered backends for this config only
+        self._factory_client: Dict[str, Callable[[], BlobStorageClient]] = {}
 
         self.__client = None
+        self.__executor = None
+        self.__cache = None
+        self.__offload = None
+        self.__buffer_pool = None
 
     def __get_blob_storage_client(self) -> BlobStorageClient:
         schema, _, _ = (
@@ -51,45 +107,159 @@ class LargeMessageSerializerConfig:
         return self.__create_blob_storage_client(schema)
 
     def __create_blob_storage_client(self, schema: str):
-        try:
-            self.__client = (
-                self.__client
-                or self._factory_client.get(schema, self.__create_empty_blob_client())()
-            )
-            return self.__client
-        except KeyError as e:
-            raise ValueError(
-                f"The schema {schema} is not supported at the moment"
-            ) from e
+        if self.__client is None:
+            factory = self._factory_client.get(schema)
+            if factory is not None:
+                self.__client = self.__create_retrying_client(factory())
+            else:
+                backend = get_backend(schema) if schema else None
+                self.__client = (
+                    self.__create_retrying_client(backend(self))
+                    if backend
+                    else self.__create_empty_blob_client()
+                )
+        return self.__client
+
+    def __create_retrying_client(self, client: BlobStorageClient) -> BlobStorageClient:
+        if (
+            self.large_message_retry_attempts <= 1
+            and self.large_message_hedge_percentile is None
+        ):
+            return client
+        return RetryingBlobStorageClient(
+            client,
+            RetryPolicy(
+                max(self.large_message_retry_attempts, 1),
+                self.large_message_retry_base_delay,
+                self.large_message_retry_max_delay,
+            ),
+            self.large_message_instrumentation,
+            self.large_message_hedge_percentile,
+            hedge_max_workers=2 * self.large_message_io_max_workers,
+            hedge_max_size=self.large_message_hedge_max_size,
+        )
 
     def __create_empty_blob_client(self) -> BlobStorageClient:
         return EmptyBlobStorage()
 
-    def __create_s3_client(self) -> BlobStorageClient:
-        s3_config = {
-            "aws_secret_access_key": self.large_message_s3_secret_key,
-            "aws_access_key_id": self.large_message_s3_access_key,
-            "region_name": self.large_message_s3_region,
-        }
-        if self.large_message_s3_endpoint:
-            s3_config["endpoint_url"] = self.large_message_s3_endpoint
-
-        if self.large_message_blob_storage_custom_config:
-            self.large_message_blob_storage_custom_config(s3_config)
-        s3_client = boto3.client("s3", **s3_config)
-        return AmazonS3Client(s3_client)
-
-    def __create_azure_blob_storage_client(self) -> BlobStorageClient:
-        abs_config = {"conn_str": self.large_message_abs_connection_string}
-        if self.large_message_blob_storage_custom_config:
-            self.large_message_blob_storage_custom_config(abs_config)
-        abs_client = BlobServiceClient.from_connection_string(**abs_config)
-        return AzureBlobStorageClient(abs_client)
+    def create_transfer_config(self) -> TransferConfig:
+        return TransferConfig(
+            multipart_threshold=self.large_message_multipart_threshold,
+            part_size=self.large_message_multipart_part_size,
+            max_concurrency=self.large_message_transfer_max_concurrency,
+            part_retries=self.large_message_transfer_part_retries,
+            download_chunk_size=self.large_message_download_chunk_size,
+            download_max_concurrency=self.large_message_download_max_concurrency,
+            part_retry_base_delay=self.large_message_retry_base_delay,
+            part_retry_max_delay=self.large_message_retry_max_delay,
+        )
+
+    def create_pool_settings(self) -> Tuple[int, float, float, bool]:
+        return (
+            self.large_message_max_pool_connections,
+            self.large_message_connect_timeout,
+            self.large_message_read_timeout,
+            self.large_message_tcp_keepalive,
+        )
+
+    def get_buffer_pool(self) -> Optional[BufferPool]:
+        if self.large_message_buffer_pool_size <= 0:
+            return None
+        self.__buffer_pool = self.__buffer_pool or BufferPool(
+            self.large_message_buffer_pool_size,
+            self.large_message_buffer_pool_max_buffer_bytes,
+        )
+        return self.__buffer_pool
+
+    def __get_executor(self) -> Executor:
+        self.__executor = self.__executor or ThreadPoolExecutor(
+            max_workers=self.large_message_io_max_workers,
+            thread_name_prefix="large-message-io",
+        )
+        return self.__executor
+
+    def __get_offload(self) -> Optional[ProcessOffload]:
+        if self.large_message_process_pool_workers <= 0:
+            return None
+        self.__offload = self.__offload or ProcessOffload(
+            self.large_message_process_pool_workers,
+            self.large_message_process_offload_threshold,
+        )
+        return self.__offload
+
+    def __get_cache(self) -> Optional[BlobCache]:
+        self.__cache = self.__cache or self.__create_cache()
+        return self.__cache
+
+    def __create_cache(self) -> Optional[BlobCache]:
+        tiers = []
+        if self.large_message_cache_max_bytes > 0:
+            tiers.append(
+                MemoryBlobCache(
+                    self.large_message_cache_max_bytes, self.large_message_cache_ttl
+                )
+            )
+        if self.large_message_disk_cache_dir:
+            tiers.append(
+                DiskBlobCache(
+                    self.large_message_disk_cache_dir,
+                    self.large_message_disk_cache_max_bytes,
+                )
+            )
+        if not tiers:
+            return None
+        return tiers[0] if len(tiers) == 1 else TieredBlobCache(tiers)
+
+    def __create_compressor(self) -> Optional[Compressor]:
+        if self.large_message_compression is None:
+            return None
+        return create_compressor(
+            self.large_message_compression, self.large_message_compression_level
+        )
 
     def create_storing_client(self):
         return StoringClient(
-            self.__get_blob_storage_client(), self.base_path, self.max_size
+            self.__get_blob_storage_client(),
+            self.base_path,
+            self.max_size,
+            self.__get_executor(),
+            self.large_message_content_addressed,
+            self.large_message_uploaded_index_size,
+            self.__create_compressor(),
+            self.large_message_instrumentation,
+            self.large_message_key_shards,
+            self.large_message_compact_pointers,
+            self.large_message_pointer_checksums,
+            self.__get_offload(),
+            self.large_message_pack_max_bytes,
+            self.large_message_delta_snapshot_interval,
+            self.large_message_delta_max_bytes,
+        )
+
+    def create_retrieving_client(self, topic: Optional[str] = None):
+        return RetrievingClient(
+            self.__get_blob_storage_client(),
+            self.__get_executor(),
+            self.__get_cache(),
+            self.large_message_instrumentation,
+            topic,
+            self.__get_offload(),
         )
 
-    def create_retrieving_client(self):
-        return RetrievingClient(self.__get_blob_storage_client())
+    def create_cleaning_client(
+        self, progress: Optional[Callable[[CleanupProgress], None]] = None
+    ):
+        return CleaningClient(
+            self.__get_blob_storage_client(),
+            self.base_path,
+            self.large_message_cleanup_max_workers,
+            progress,
+        )
+
+    def create_upload_pipeline(self):
+        return UploadPipeline(
+            self.create_storing_client(),
+            self.__get_executor(),
+            self.large_message_max_in_flight_bytes,
+            self.large_message_max_in_flight_uploads,
+        )
@@ -0,0 +1,92 @@
+from contextlib import ExitStack
+from typing import ContextManager, List, Optional
+
+
+class _NoSpan:
+    # contextlib.nullcontext is not available on Python 3.6
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Instrumentation:
+    """Receives measurements of the serializer hot path.
+
+    All hooks are no-ops, subclasses override the ones they are interested in.
+    Hooks may be called from the I/O threads and must be thread-safe.
+    """
+
+    def on_store(self, topic: str, size: int, is_backed: bool) -> None:
+        pass
+
+    def on_retrieve(self, topic: Optional[str], size: int, is_backed: bool) -> None:
+        pass
+
+    def on_upload(self, topic: str, size: int, seconds: float) -> None:
+        pass
+
+    def on_download(self, topic: Optional[str], size: int, seconds: float) -> None:
+        pass
+
+    def on_cache_hit(self, topic: Optional[str]) -> None:
+        pass
+
+    def on_cache_miss(self, topic: Optional[str]) -> None:
+        pass
+
+    def on_retry(self, operation: str, attempt: int, error: BaseException) -> None:
+        pass
+
+    def on_hedge(self, operation: str) -> None:
+        pass
+
+    def span(self, name: str, **attributes) -> ContextManager:
+        return _NO_SPAN
+
+
+class CompositeInstrumentation(Instrumentation):
+    def __init__(self, instrumentations: List[Instrumentation]):
+        self._instrumentations = instrumentations
+
+    def on_store(self, topic: str, size: int, is_backed: bool) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.on_store(topic, size, is_backed)
+
+    def on_retrieve(self, topic: Optional[str], size: int, is_backed: bool) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.on_retrieve(topic, size, is_backed)
+
+    def on_upload(self, topic: str, size: int, seconds: float) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.on_upload(topic, size, seconds)
+
+    def on_download(self, topic: Optional[str], size: int, seconds: float) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.on_download(topic, size, seconds)
+
+    def on_cache_hit(self, topic: Optional[str]) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.on_cache_hit(topic)
+
+    def on_cache_miss(self, topic: Optional[str]) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.on_cache_miss(topic)
+
+    def on_retry(self, operation: str, attempt: int, error: BaseException) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.on_retry(operation, attempt, error)
+
+    def on_hedge(self, operation: str) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.on_hedge(operation)
+
+    def span(self, name: str, **attributes) -> ContextManager:
+        stack = ExitStack()
+        for instrumentation in self._instrumentations:
+            stack.enter_context(instrumentation.span(name, **attributes))
+        return stack
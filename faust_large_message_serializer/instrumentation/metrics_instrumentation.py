@@ -0,0 +1,98 @@
+from bisect import bisect_left
+from collections import Counter
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    Instrumentation,
+)
+
+SIZE_BOUNDARIES = [1000 * 4**exponent for exponent in range(11)]
+LATENCY_BOUNDARIES = [0.001 * 2**exponent for exponent in range(16)]
+
+
+class Histogram:
+    def __init__(self, boundaries: List[float]):
+        self.boundaries = boundaries
+        self.buckets = [0] * (len(boundaries) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(self.boundaries, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self) -> Dict:
+        return {
+            "boundaries": self.boundaries,
+            "buckets": list(self.buckets),
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class MetricsInstrumentation(Instrumentation):
+    """Collects counters and histograms per topic in memory.
+
+    ``snapshot`` returns them keyed by ``(metric, topic)``, e.g. to export them
+    periodically from a Faust timer.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counters: Counter = Counter()
+        self._histograms: Dict[Tuple[str, Optional[str]], Histogram] = {}
+
+    def on_store(self, topic: str, size: int, is_backed: bool) -> None:
+        kind = "backed" if is_backed else "inline"
+        with self._lock:
+            self._counters[f"stored_{kind}_messages", topic] += 1
+            self.__observe(f"stored_{kind}_size", topic, size, SIZE_BOUNDARIES)
+
+    def on_retrieve(self, topic: Optional[str], size: int, is_backed: bool) -> None:
+        kind = "backed" if is_backed else "inline"
+        with self._lock:
+            self._counters[f"retrieved_{kind}_messages", topic] += 1
+            self.__observe(f"retrieved_{kind}_size", topic, size, SIZE_BOUNDARIES)
+
+    def on_upload(self, topic: str, size: int, seconds: float) -> None:
+        with self._lock:
+            self._counters["uploaded_bytes", topic] += size
+            self.__observe("upload_seconds", topic, seconds, LATENCY_BOUNDARIES)
+
+    def on_download(self, topic: Optional[str], size: int, seconds: float) -> None:
+        with self._lock:
+            self._counters["downloaded_bytes", topic] += size
+            self.__observe("download_seconds", topic, seconds, LATENCY_BOUNDARIES)
+
+    def on_cache_hit(self, topic: Optional[str]) -> None:
+        with self._lock:
+            self._counters["cache_hits", topic] += 1
+
+    def on_cache_miss(self, topic: Optional[str]) -> None:
+        with self._lock:
+            self._counters["cache_misses", topic] += 1
+
+    def on_retry(self, operation: str, attempt: int, error: BaseException) -> None:
+        with self._lock:
+            self._counters[f"{operation}_retries", None] += 1
+
+    def on_hedge(self, operation: str) -> None:
+        with self._lock:
+            self._counters[f"{operation}_hedges", None] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, Optional[str]], object]:
+        with self._lock:
+            metrics: Dict[Tuple[str, Optional[str]], object] = dict(self._counters)
+            for key, histogram in self._histograms.items():
+                metrics[key] = histogram.as_dict()
+            return metrics
+
+    def __observe(
+        self, metric: str, topic: Optional[str], value: float, boundaries: List[float]
+    ) -> None:
+        histogram = self._histograms.get((metric, topic))
+        if histogram is None:
+            histogram = self._histograms[metric, topic] = Histogram(boundaries)
+        histogram.observe(value)
@@ -0,0 +1,50 @@
+from typing import Optional
+
+from faust.sensors import Monitor
+
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    Instrumentation,
+)
+
+
+class MonitorInstrumentation(Instrumentation):
+    """Counts messages, bytes, cache hits and retries on a Faust ``Monitor``.
+
+    The counters are named ``large_message.<topic>.<metric>`` and are added with
+    ``Monitor.count``, which the statsd and Datadog monitors forward.
+    """
+
+    PREFIX = "large_message"
+
+    def __init__(self, monitor: Monitor):
+        self._monitor = monitor
+
+    def on_store(self, topic: str, size: int, is_backed: bool) -> None:
+        kind = "backed" if is_backed else "inline"
+        self.__count(topic, f"stored_{kind}_messages")
+
+    def on_retrieve(self, topic: Optional[str], size: int, is_backed: bool) -> None:
+        kind = "backed" if is_backed else "inline"
+        self.__count(topic, f"retrieved_{kind}_messages")
+
+    def on_upload(self, topic: str, size: int, seconds: float) -> None:
+        self.__count(topic, "uploaded_bytes", size)
+
+    def on_download(self, topic: Optional[str], size: int, seconds: float) -> None:
+        self.__count(topic, "downloaded_bytes", size)
+
+    def on_cache_hit(self, topic: Optional[str]) -> None:
+        self.__count(topic, "cache_hits")
+
+    def on_cache_miss(self, topic: Optional[str]) -> None:
+        self.__count(topic, "cache_misses")
+
+    def on_retry(self, operation: str, attempt: int, error: BaseException) -> None:
+        self.__count(None, f"{operation}_retries")
+
+    def on_hedge(self, operation: str) -> None:
+        self.__count(None, f"{operation}_hedges")
+
+    def __count(self, topic: Optional[str], metric: str, count: int = 1) -> None:
+        name = ".".join(filter(None, [self.PREFIX, topic, metric]))
+        self._monitor.count(name, count)
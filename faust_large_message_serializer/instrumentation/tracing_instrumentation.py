@@ -0,0 +1,27 @@
+from typing import Any, Callable, ContextManager, Dict
+
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    Instrumentation,
+)
+
+
+class TracingInstrumentation(Instrumentation):
+    """Wraps stores, retrievals, uploads and downloads in spans.
+
+    ``start_span`` is called with the span name and its attributes and must return
+    a context manager, e.g. for OpenTelemetry::
+
+        TracingInstrumentation(
+            lambda name, attributes: tracer.start_as_current_span(
+                name, attributes=attributes
+            )
+        )
+    """
+
+    def __init__(self, start_span: Callable[[str, Dict[str, Any]], ContextManager]):
+        self._start_span = start_span
+
+    def span(self, name: str, **attributes) -> ContextManager:
+        return self._start_span(
+            name, {key: value for key, value in attributes.items() if value is not None}
+        )
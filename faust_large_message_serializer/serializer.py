@@ -1,4 +1,8 @@
+from typing import Any, List, Sequence
+
 from faust.serializers.codecs import Codec
+from faust.utils import json as faust_json
+from loguru import logger
 from faust_large_message_serializer.config import LargeMessageSerializerConfig
 
 class LargeMessageSerializer(Codec):
@@ -16,10 +20,79 @@ class LargeMessageSerializer(Codec):
         self._config = config
         self._is_key = is_key
         self._storage_client = config.create_storing_client()
-        self._retriever_client = config.create_retrieving_client()
+        self._retriever_client = config.create_retrieving_client(output_topic)
+        self._zero_copy = config.large_message_zero_copy_loads
+        if self._zero_copy and faust_json.orjson is None:
+            # the json codec decodes memory views with orjson only
+            logger.warning("Zero-copy loads require orjson, loads return bytes")
+            self._zero_copy = False
 
     def _loads(self, s: bytes) -> bytes:
+        if self._zero_copy:
+            return self._retriever_client.retrieve_view(s)
         return self._retriever_client.retrieve_bytes(s)
 
     def _dumps(self, s: bytes) -> bytes:
         return self._storage_client.store_bytes(self._output_topic, s, self._is_key)
+
+    async def _loads_async(self, s: bytes) -> bytes:
+        return await self._retriever_client.retrieve_bytes_async(s, self._zero_copy)
+
+    async def _dumps_async(self, s: bytes) -> bytes:
+        return await self._storage_client.store_bytes_async(
+            self._output_topic, s, self._is_key
+        )
+
+    async def loads_async(self, s: bytes) -> Any:
+        for node in reversed(self.nodes):
+            if isinstance(node, LargeMessageSerializer):
+                s = await node._loads_async(s)
+            else:
+                s = node._loads(s)
+        return s
+
+    async def dumps_async(self, obj: Any) -> bytes:
+        for node in self.nodes:
+            if isinstance(node, LargeMessageSerializer):
+                obj = await node._dumps_async(obj)
+            else:
+                obj = node._dumps(obj)
+        return obj
+
+    def dumps_for_key(self, record_key: bytes, obj: Any) -> bytes:
+        for node in self.nodes:
+            if isinstance(node, LargeMessageSerializer):
+                obj = node._storage_client.store_bytes(
+                    node._output_topic, obj, node._is_key, record_key
+                )
+            else:
+                obj = node._dumps(obj)
+        return obj
+
+    def dumps_many(self, objs: Sequence[Any]) -> List[bytes]:
+        for node in self.nodes:
+            if isinstance(node, LargeMessageSerializer):
+                objs = node._storage_client.store_many(
+                    node._output_topic, objs, node._is_key
+                )
+            else:
+                objs = [node._dumps(obj) for obj in objs]
+        return list(objs)
+
+    def loads_many(self, items: Sequence[bytes]) -> List[Any]:
+        for node in reversed(self.nodes):
+            if isinstance(node, LargeMessageSerializer):
+                items = node._retriever_client.retrieve_many(items, node._zero_copy)
+            else:
+                items = [node._loads(item) for item in items]
+        return list(items)
+
+    async def loads_many_async(self, items: Sequence[bytes]) -> List[Any]:
+        for node in reversed(self.nodes):
+            if isinstance(node, LargeMessageSerializer):
+                items = await node._retriever_client.retrieve_many_async(
+                    items, node._zero_copy
+                )
+            else:
+                items = [node._loads(item) for item in items]
+        return list(items)
@@ -0,0 +1,180 @@
+import struct
+import sys
+from typing import Dict, List, Optional, Tuple, Union
+
+# The payload of a delta message references the serialized message of its base
+# version, followed by the operations that turn the base into the new version:
+#
+#   base length (4) | base message | target length (8) | operations
+#
+# An operation either copies a range of the base, COPY | offset (8) | length (8),
+# or adds literal bytes, ADD | length (8) | bytes.
+COPY = 0
+ADD = 1
+BLOCK_SIZE = 64
+# positions of the target probed for matches before it is scanned
+SAMPLES = 32
+
+_BASE_LENGTH = struct.Struct(">I")
+_TARGET_LENGTH = struct.Struct(">Q")
+_COPY = struct.Struct(">BQQ")
+_ADD = struct.Struct(">BQ")
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def _common_prefix(a: Buffer, b: Buffer, a_start: int, b_start: int, limit: int) -> int:
+    # compares chunks of shrinking size instead of single bytes
+    length, step = 0, 4096
+    while length < limit:
+        size = min(step, limit - length)
+        if (
+            a[a_start + length : a_start + length + size]
+            == b[b_start + length : b_start + length + size]
+        ):
+            length += size
+        elif size == 1:
+            break
+        else:
+            step = max(size // 2, 1)
+    return length
+
+
+def _common_suffix(a: Buffer, b: Buffer, limit: int) -> int:
+    length, step = 0, 4096
+    while length < limit:
+        size = min(step, limit - length)
+        if (
+            a[len(a) - length - size : len(a) - length]
+            == b[len(b) - length - size : len(b) - length]
+        ):
+            length += size
+        elif size == 1:
+            break
+        else:
+            step = max(size // 2, 1)
+    return length
+
+
+def _count_sampled_matches(
+    blocks: Dict[bytes, int], target: bytes, start: int, end: int
+) -> int:
+    # a sample matches if any block starting in its first BLOCK_SIZE bytes is
+    # in the base, which holds for samples inside copies of 2 * BLOCK_SIZE bytes
+    step = (end - start) // SAMPLES
+    return sum(
+        any(
+            target[position : position + BLOCK_SIZE] in blocks
+            for position in range(sample, sample + BLOCK_SIZE)
+        )
+        for sample in range(start, start + SAMPLES * step, step)
+    )
+
+
+def create_delta(
+    base: Buffer, target: Buffer, max_size: Optional[int] = None
+) -> Optional[bytes]:
+    """Returns the operations that turn ``base`` into ``target``, or None if
+    they would exceed ``max_size`` bytes.
+
+    Unchanged head and tail are copied as a whole, matches in between are found
+    with an index of the aligned blocks of the base. Unmatched bytes are scanned
+    one at a time, so large targets are sampled first and given up on if too
+    few samples match the base to stay within ``max_size``. The scan also
+    stops as soon as the operations so far and the pending literal bytes exceed
+    ``max_size``.
+    """
+    base, target = bytes(base), bytes(target)
+    operations: List[bytes] = [_TARGET_LENGTH.pack(len(target))]
+    size = _TARGET_LENGTH.size
+    if max_size is None:
+        max_size = sys.maxsize
+
+    def append(operation: bytes) -> None:
+        nonlocal size
+        operations.append(operation)
+        size += len(operation)
+
+    def add(start: int, end: int) -> None:
+        if end > start:
+            append(_ADD.pack(ADD, end - start))
+            append(target[start:end])
+
+    prefix = _common_prefix(base, target, 0, 0, min(len(base), len(target)))
+    suffix = _common_suffix(base, target, min(len(base), len(target)) - prefix)
+    if prefix:
+        append(_COPY.pack(COPY, 0, prefix))
+
+    blocks: Dict[bytes, int] = {}
+    for offset in range(0, len(base) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        blocks.setdefault(base[offset : offset + BLOCK_SIZE], offset)
+
+    end = len(target) - suffix
+    if end - prefix >= SAMPLES * 2 * BLOCK_SIZE:
+        # share of the remaining bytes that must be copied, samples outside
+        # copies of 2 * BLOCK_SIZE bytes are missed, so only half is required
+        copied = 1 - (max_size - size) / (end - prefix)
+        if _count_sampled_matches(blocks, target, prefix, end) < copied * SAMPLES / 2:
+            return None
+
+    position = literal_start = prefix
+    while position + BLOCK_SIZE <= end:
+        offset = blocks.get(target[position : position + BLOCK_SIZE])
+        if offset is None:
+            position += 1
+            if size + _ADD.size + position - literal_start > max_size:
+                return None
+            continue
+        length = BLOCK_SIZE + _common_prefix(
+            base,
+            target,
+            offset + BLOCK_SIZE,
+            position + BLOCK_SIZE,
+            min(len(base) - offset, end - position) - BLOCK_SIZE,
+        )
+        add(literal_start, position)
+        append(_COPY.pack(COPY, offset, length))
+        position = literal_start = position + length
+    add(literal_start, end)
+
+    if suffix:
+        append(_COPY.pack(COPY, len(base) - suffix, suffix))
+    if size > max_size:
+        return None
+    return b"".join(operations)
+
+
+def apply_delta(base: Buffer, delta: Buffer) -> bytes:
+    base, delta = memoryview(base), memoryview(delta)
+    (target_length,) = _TARGET_LENGTH.unpack_from(delta)
+    position = _TARGET_LENGTH.size
+    parts = []
+    while position < len(delta):
+        if delta[position] == COPY:
+            _, offset, length = _COPY.unpack_from(delta, position)
+            position += _COPY.size
+            if offset + length > len(base):
+                raise ValueError("Delta does not match its base")
+            parts.append(base[offset : offset + length])
+        elif delta[position] == ADD:
+            _, length = _ADD.unpack_from(delta, position)
+            position += _ADD.size
+            parts.append(delta[position : position + length])
+            position += length
+        else:
+            raise ValueError(f"Unsupported delta operation {delta[position]}")
+    target = b"".join(parts)
+    if len(target) != target_length:
+        raise ValueError("Delta does not match its base")
+    return target
+
+
+def encode_delta_payload(base_message: bytes, delta: bytes) -> bytes:
+    return _BASE_LENGTH.pack(len(base_message)) + base_message + delta
+
+
+def decode_delta_payload(payload: Buffer) -> Tuple[bytes, memoryview]:
+    payload = memoryview(payload)
+    (base_length,) = _BASE_LENGTH.unpack_from(payload)
+    base_end = _BASE_LENGTH.size + base_length
+    return bytes(payload[_BASE_LENGTH.size : base_end]), payload[base_end:]
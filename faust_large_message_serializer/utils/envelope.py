@@ -0,0 +1,35 @@
+from typing import Tuple
+
+# The first byte of every serialized message is a flag. Bit 0 marks backed
+# messages, bits 1-3 hold the id of the compression codec (0 = uncompressed)
+# and bit 4 marks backed messages with a compact binary pointer instead of a URI.
+# Bit 5 marks payloads that are a delta against the base version they reference.
+# Uncompressed messages with URIs are therefore compatible with the Java SerDe.
+BACKED_MASK = 0x01
+CODEC_MASK = 0x0E
+CODEC_SHIFT = 1
+POINTER_MASK = 0x10
+DELTA_MASK = 0x20
+
+
+def create_flag(
+    is_backed: bool, codec_id: int = 0, is_compact: bool = False, is_delta: bool = False
+) -> bytes:
+    return bytes(
+        [
+            (BACKED_MASK if is_backed else 0)
+            | (codec_id << CODEC_SHIFT)
+            | (POINTER_MASK if is_compact else 0)
+            | (DELTA_MASK if is_delta else 0)
+        ]
+    )
+
+
+def parse_flag(flag: int) -> Tuple[bool, int]:
+    if flag & ~(BACKED_MASK | CODEC_MASK | POINTER_MASK | DELTA_MASK):
+        raise ValueError("Message can only be marked as backed or non-backed")
+    return bool(flag & BACKED_MASK), (flag & CODEC_MASK) >> CODEC_SHIFT
+
+
+def is_delta(flag: int) -> bool:
+    return bool(flag & DELTA_MASK)
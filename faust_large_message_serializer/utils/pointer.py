@@ -0,0 +1,130 @@
+import struct
+import zlib
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional, Tuple, Union
+from uuid import UUID
+
+from faust_large_message_serializer.utils.envelope import POINTER_MASK
+from faust_large_message_serializer.utils.uri_parser import URIParser
+
+# A compact pointer follows the flag byte of a backed message instead of the
+# UTF-8 URI of the blob:
+#
+#   version (1) | fields (1) | location length (2) | location | blob id (16)
+#   | offset (8, if HAS_OFFSET) | size (8, if HAS_SIZE)
+#   | CRC-32 (4, if HAS_CHECKSUM)
+#
+# The location is the URI of the directory of the blob, e.g.
+# s3://bucket/path/topic/values/, and the key is the location path followed by
+# the blob id, formatted as UUID or, for content hashes, as hex string.
+# Payloads packed into a shared blob have an offset and their size.
+POINTER_VERSION = 1
+HAS_SIZE = 0x01
+HAS_CHECKSUM = 0x02
+IS_CONTENT_HASH = 0x04
+HAS_OFFSET = 0x08
+BLOB_ID_LENGTH = 16
+
+_HEADER = struct.Struct(">BBH")
+_SIZE = struct.Struct(">Q")
+_OFFSET = struct.Struct(">Q")
+_CHECKSUM = struct.Struct(">I")
+
+
+class BlobPointer(NamedTuple):
+    uri: str
+    bucket: str
+    key: str
+    size: Optional[int] = None
+    checksum: Optional[int] = None
+    offset: Optional[int] = None
+
+    @property
+    def cache_key(self) -> str:
+        if self.offset is None:
+            return self.uri
+        return f"{self.uri}#{self.offset}-{self.offset + self.size}"
+
+    def verify(
+        self,
+        data: Union[bytes, memoryview],
+        crc32: Callable[[Union[bytes, memoryview]], int] = zlib.crc32,
+    ) -> None:
+        if self.size is not None and len(data) != self.size:
+            raise ValueError(
+                f"Blob {self.uri} has {len(data)} bytes, expected {self.size}"
+            )
+        if self.checksum is not None and crc32(data) != self.checksum:
+            raise ValueError(f"Blob {self.uri} does not match its checksum")
+
+
+def format_blob_id(blob_id: bytes, is_content_hash: bool) -> str:
+    return blob_id.hex() if is_content_hash else str(UUID(bytes=blob_id))
+
+
+def encode_pointer(
+    location: bytes,
+    blob_id: bytes,
+    is_content_hash: bool = False,
+    size: Optional[int] = None,
+    checksum: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> bytes:
+    if offset is not None and size is None:
+        raise ValueError("Pointers with offset must have a size")
+    fields = (
+        (HAS_OFFSET if offset is not None else 0)
+        | (HAS_SIZE if size is not None else 0)
+        | (HAS_CHECKSUM if checksum is not None else 0)
+        | (IS_CONTENT_HASH if is_content_hash else 0)
+    )
+    parts = [_HEADER.pack(POINTER_VERSION, fields, len(location)), location, blob_id]
+    if offset is not None:
+        parts.append(_OFFSET.pack(offset))
+    if size is not None:
+        parts.append(_SIZE.pack(size))
+    if checksum is not None:
+        parts.append(_CHECKSUM.pack(checksum))
+    return b"".join(parts)
+
+
+def decode_pointer(data: bytes) -> BlobPointer:
+    """Decodes the pointer of a backed message, including its flag byte."""
+    if not data[0] & POINTER_MASK:
+        uri = bytes(data[1:]).decode()
+        _, bucket, key = URIParser(uri).parse_uri()
+        return BlobPointer(uri, bucket, key)
+
+    version, fields, location_length = _HEADER.unpack_from(data, 1)
+    if version != POINTER_VERSION:
+        raise ValueError(f"Pointer version {version} is not supported")
+    position = 1 + _HEADER.size
+    location, bucket, path = _parse_location(
+        bytes(data[position : position + location_length])
+    )
+    position += location_length
+    blob_id = format_blob_id(
+        bytes(data[position : position + BLOB_ID_LENGTH]),
+        bool(fields & IS_CONTENT_HASH),
+    )
+    position += BLOB_ID_LENGTH
+    offset = size = checksum = None
+    if fields & HAS_OFFSET:
+        (offset,) = _OFFSET.unpack_from(data, position)
+        position += _OFFSET.size
+    if fields & HAS_SIZE:
+        (size,) = _SIZE.unpack_from(data, position)
+        position += _SIZE.size
+    if fields & HAS_CHECKSUM:
+        (checksum,) = _CHECKSUM.unpack_from(data, position)
+    return BlobPointer(
+        location + blob_id, bucket, path + blob_id, size, checksum, offset
+    )
+
+
+@lru_cache(maxsize=4096)
+def _parse_location(location: bytes) -> Tuple[str, str, str]:
+    # locations repeat for every blob of a topic, so they are parsed only once
+    location_uri = location.decode()
+    _, bucket, path = URIParser(location_uri).parse_uri()
+    return location_uri, bucket, path
@@ -0,0 +1,135 @@
+import hashlib
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Callable, Optional, TypeVar, Union
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover
+    # Python < 3.8, buffers are pickled instead
+    shared_memory = None
+
+T = TypeVar("T")
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def content_hash(data: Buffer, digest_size: int) -> bytes:
+    return hashlib.blake2b(data, digest_size=digest_size).digest()
+
+
+class ProcessOffload:
+    """Runs CPU-heavy transforms of large payloads in a process pool.
+
+    Compression, hashing and checksums hold the GIL or at least a core for the
+    whole payload. Payloads of at least ``threshold`` bytes are handed to worker
+    processes through shared memory instead of being pickled, smaller ones are
+    transformed in the calling thread. Transforms must be picklable, e.g. module
+    level functions or methods of picklable objects.
+
+    Workers are spawned instead of forked, since forking a process with running
+    I/O threads may copy locks that are held and deadlock the worker.
+    """
+
+    def __init__(self, max_workers: int, threshold: int):
+        self._max_workers = max_workers
+        self._threshold = threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
+
+    def run(
+        self,
+        function: Callable[..., T],
+        data: Buffer,
+        *args,
+        expected_size: Optional[int] = None,
+    ) -> T:
+        """Runs ``function(data, *args)``. ``expected_size`` is the estimated
+        size of the result, if it is larger than ``data``, e.g. when
+        decompressing."""
+        if max(len(data), expected_size or 0) < self._threshold:
+            return function(data, *args)
+        if shared_memory is None:  # pragma: no cover
+            return self.__get_executor().submit(function, bytes(data), *args).result()
+
+        block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        try:
+            block.buf[: len(data)] = data
+            result = (
+                self.__get_executor()
+                .submit(
+                    _run_on_shared_memory,
+                    function,
+                    block.name,
+                    len(data),
+                    self._threshold,
+                    *args,
+                )
+                .result()
+            )
+        finally:
+            block.close()
+            block.unlink()
+        if isinstance(result, _SharedResult):
+            return result.read()
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self.__create_executor()
+            return self._executor
+
+    def __create_executor(self) -> ProcessPoolExecutor:
+        if sys.version_info < (3, 7):  # pragma: no cover
+            return ProcessPoolExecutor(max_workers=self._max_workers)
+        return ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+
+class _SharedResult:
+    """Large ``bytes`` result of a worker, returned through shared memory."""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+
+    def read(self) -> bytes:
+        block = shared_memory.SharedMemory(name=self.name)
+        try:
+            return bytes(block.buf[: self.size])
+        finally:
+            block.close()
+            block.unlink()
+
+
+def _run_on_shared_memory(
+    function: Callable[..., T], name: str, size: int, threshold: int, *args
+) -> Union[T, _SharedResult]:
+    # workers share the resource tracker of the parent, which unlinks the block
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = block.buf[:size]
+        try:
+            result = function(data, *args)
+        finally:
+            data.release()
+    finally:
+        block.close()
+
+    if not isinstance(result, (bytes, bytearray)) or len(result) < threshold:
+        return result
+    result_block = shared_memory.SharedMemory(create=True, size=max(len(result), 1))
+    result_block.buf[: len(result)] = result
+    result_block.close()
+    # the parent unlinks the block once it has read it
+    return _SharedResult(result_block.name, len(result))
@@ -0,0 +1,262 @@
+import base64
+import io
+from unittest.mock import MagicMock
+
+import pytest
+
+from faust_large_message_serializer.blob_storage.amazon_blob_storage import (
+    AmazonS3Client,
+    S3UploadException,
+)
+from faust_large_message_serializer.blob_storage.azure_blob_storage import (
+    AzureBlobStorageClient,
+)
+from faust_large_message_serializer.blob_storage.blob_storage import BlobObject
+from faust_large_message_serializer.blob_storage.buffer_pool import BufferPool
+from faust_large_message_serializer.blob_storage.transfer import (
+    TransferConfig,
+    TransferError,
+)
+
+transfer_config = TransferConfig(
+    multipart_threshold=10, part_size=4, max_concurrency=2, part_retries=1
+)
+
+
+def test_s3_multipart_upload():
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload"}
+    s3_client.upload_part.side_effect = lambda **kwargs: {
+        "ETag": kwargs["Body"].decode()
+    }
+    client = AmazonS3Client(s3_client, transfer_config)
+
+    uri = client.put_object(b"aaaabbbbccccd", "bucket", "key")
+
+    assert uri == "s3://bucket/key"
+    s3_client.put_object.assert_not_called()
+    s3_client.complete_multipart_upload.assert_called_once_with(
+        Bucket="bucket",
+        Key="key",
+        UploadId="upload",
+        MultipartUpload={
+            "Parts": [
+                {"ETag": "aaaa", "PartNumber": 1},
+                {"ETag": "bbbb", "PartNumber": 2},
+                {"ETag": "cccc", "PartNumber": 3},
+                {"ETag": "d", "PartNumber": 4},
+            ]
+        },
+    )
+
+
+def test_s3_multipart_upload_retries_failed_parts():
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload"}
+    s3_client.upload_part.side_effect = [
+        ConnectionError(),
+        {"ETag": "a"},
+        {"ETag": "b"},
+        {"ETag": "c"},
+    ]
+    client = AmazonS3Client(
+        s3_client,
+        TransferConfig(multipart_threshold=10, part_size=4, max_concurrency=1),
+    )
+
+    client.put_object(b"aaaabbbbcccc", "bucket", "key")
+
+    assert s3_client.upload_part.call_count == 4
+    s3_client.complete_multipart_upload.assert_called_once()
+
+
+def test_s3_multipart_upload_aborts_on_failure():
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload"}
+    s3_client.upload_part.side_effect = ConnectionError()
+    client = AmazonS3Client(s3_client, transfer_config)
+
+    with pytest.raises(S3UploadException):
+        client.put_object(b"aaaabbbbccccd", "bucket", "key")
+
+    s3_client.abort_multipart_upload.assert_called_once_with(
+        Bucket="bucket", Key="key", UploadId="upload"
+    )
+    s3_client.complete_multipart_upload.assert_not_called()
+
+
+def test_s3_multipart_upload_does_not_retry_permanent_errors():
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload"}
+    s3_client.upload_part.side_effect = ValueError()
+    client = AmazonS3Client(
+        s3_client,
+        TransferConfig(multipart_threshold=10, part_size=4, max_concurrency=1),
+    )
+
+    with pytest.raises(S3UploadException):
+        client.put_object(b"aaaabbbbcccc", "bucket", "key")
+
+    assert s3_client.upload_part.call_count == 1
+
+
+def test_s3_failed_multipart_upload_is_not_retried_again():
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload"}
+    s3_client.upload_part.side_effect = ConnectionError()
+    client = AmazonS3Client(s3_client, transfer_config)
+
+    with pytest.raises(S3UploadException) as error:
+        client.put_object(b"aaaabbbbccccd", "bucket", "key")
+
+    assert isinstance(error.value.__cause__, TransferError)
+    assert not client.is_retryable(error.value)
+
+
+def test_azure_staged_block_upload():
+    abs_client = MagicMock()
+    blob_client = (
+        abs_client.get_container_client.return_value.get_blob_client.return_value
+    )
+    client = AzureBlobStorageClient(abs_client, transfer_config)
+
+    uri = client.put_object(b"aaaabbbbccccd", "bucket", "key")
+
+    assert uri == "abs://bucket/key"
+    assert blob_client.stage_block.call_count == 4
+    blob_client.upload_blob.assert_not_called()
+    blocks = blob_client.commit_block_list.call_args[0][0]
+    assert [base64.b64decode(block.id) for block in blocks] == [
+        b"00000000",
+        b"00000001",
+        b"00000002",
+        b"00000003",
+    ], "Blocks should be committed in order"
+
+
+class FakeS3Object:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.ranges = []
+
+    def get_object(self, Bucket, Key, Range=None):
+        if Range is None:
+            return {"Body": io.BytesIO(self.data)}
+        self.ranges.append(Range)
+        start, end = map(int, Range[len("bytes=") :].split("-"))
+        end = min(end, len(self.data) - 1)
+        return {
+            "Body": io.BytesIO(self.data[start : end + 1]),
+            "ContentRange": f"bytes {start}-{end}/{len(self.data)}",
+        }
+
+
+def test_s3_ranged_download():
+    s3_object = FakeS3Object(b"aaaabbbbccccd")
+    client = AmazonS3Client(
+        s3_object, TransferConfig(download_chunk_size=4, download_max_concurrency=2)
+    )
+
+    assert client.get_object("bucket", "key") == b"aaaabbbbccccd"
+    assert sorted(s3_object.ranges) == [
+        "bytes=0-3",
+        "bytes=12-12",
+        "bytes=4-7",
+        "bytes=8-11",
+    ]
+
+
+def test_s3_small_object_download_uses_single_request():
+    s3_object = FakeS3Object(b"aaaa")
+    client = AmazonS3Client(s3_object, TransferConfig(download_chunk_size=4))
+
+    assert client.get_object("bucket", "key") == b"aaaa"
+    assert s3_object.ranges == ["bytes=0-3"]
+
+
+def test_s3_download_into_pooled_buffers():
+    buffer_pool = BufferPool(1, 100)
+    client = AmazonS3Client(
+        FakeS3Object(b"aaaabbbbccccd"),
+        TransferConfig(download_chunk_size=4),
+        buffer_pool=buffer_pool,
+    )
+
+    first = client.get_object("bucket", "key")
+    assert isinstance(first, memoryview)
+    assert first == b"aaaabbbbccccd"
+    first_buffer = first.obj
+    del first
+
+    second = client.get_object("bucket", "key")
+    assert second == b"aaaabbbbccccd"
+    assert second.obj is first_buffer
+
+
+def test_s3_delete_all_objects_paginates_and_batches():
+    s3_client = MagicMock()
+    s3_client.get_paginator.return_value.paginate.return_value = [
+        {
+            "Versions": [
+                {"Key": f"foo/{index}", "VersionId": "v", "LastModified": None}
+                for index in range(1500)
+            ]
+        },
+        {"DeleteMarkers": [{"Key": "foo/deleted", "LastModified": None}]},
+        {},
+    ]
+    s3_client.delete_objects.return_value = {}
+    client = AmazonS3Client(s3_client)
+
+    client.delete_all_objects("bucket", "foo")
+
+    batches = [
+        call.kwargs["Delete"]["Objects"]
+        for call in s3_client.delete_objects.call_args_list
+    ]
+    assert [len(batch) for batch in batches] == [1000, 501]
+    assert batches[0][0] == {"Key": "foo/0", "VersionId": "v"}
+    assert batches[-1][-1] == {"Key": "foo/deleted"}
+
+
+def test_azure_delete_objects_in_batch():
+    container_client = MagicMock()
+    container_client.delete_blobs.return_value = iter(
+        [MagicMock(status_code=202), MagicMock(status_code=403)]
+    )
+    abs_client = MagicMock()
+    abs_client.get_container_client.return_value = container_client
+    client = AzureBlobStorageClient(abs_client)
+
+    deleted = client.delete_objects(
+        "bucket", [BlobObject("foo/1", None, 1), BlobObject("foo/2", None, 1)]
+    )
+
+    assert deleted == 1
+    container_client.delete_blobs.assert_called_once_with(
+        "foo/1", "foo/2", raise_on_any_failure=False
+    )
+
+
+def test_s3_stream_upload_in_windows():
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload"}
+    s3_client.upload_part.side_effect = lambda **kwargs: {
+        "ETag": kwargs["Body"].decode()
+    }
+    client = AmazonS3Client(s3_client, transfer_config)
+
+    uri = client.put_object_stream(
+        io.BytesIO(b"aaaabbbbccccddddeeeefff"), "bucket", "key"
+    )
+
+    assert uri == "s3://bucket/key"
+    parts = s3_client.complete_multipart_upload.call_args.kwargs["MultipartUpload"][
+        "Parts"
+    ]
+    assert parts == [
+        {"ETag": etag, "PartNumber": number}
+        for number, etag in enumerate(
+            ["aaaa", "bbbb", "cccc", "dddd", "eeee", "fff"], 1
+        )
+    ]
@@ -0,0 +1,49 @@
+from faust_large_message_serializer.blob_storage.buffer_pool import BufferPool
+
+
+def test_reuses_released_buffer():
+    buffer_pool = BufferPool(1, 100)
+
+    view = buffer_pool.acquire(50)
+    buffer = view.obj
+    view.release()
+
+    view = buffer_pool.acquire(40)
+    assert view.obj is buffer
+    assert len(view) == 40
+
+
+def test_does_not_reuse_buffer_with_views():
+    buffer_pool = BufferPool(2, 100)
+
+    view = buffer_pool.acquire(50)
+    part = view[10:20]
+    del view
+
+    other = buffer_pool.acquire(50)
+    assert other.obj is not part.obj
+    part[:] = b"x" * 10
+    assert bytes(other[10:20]) != b"x" * 10
+
+
+def test_allocates_unpooled_buffers_when_exhausted():
+    buffer_pool = BufferPool(1, 100)
+
+    first = buffer_pool.acquire(50)
+    second = buffer_pool.acquire(50)
+    large = buffer_pool.acquire(200)
+    del first
+
+    assert buffer_pool.acquire(50).obj is not second.obj
+    assert len(large) == 200
+
+
+def test_replaces_smaller_free_buffer():
+    buffer_pool = BufferPool(1, 100)
+
+    buffer_pool.acquire(10).release()
+    view = buffer_pool.acquire(80)
+    buffer = view.obj
+    view.release()
+
+    assert buffer_pool.acquire(80).obj is buffer
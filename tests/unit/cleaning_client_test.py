@@ -0,0 +1,47 @@
+import os
+import time
+from datetime import timedelta
+
+from faust_large_message_serializer import LargeMessageSerializerConfig
+from faust_large_message_serializer.blob_storage.file_blob_storage import (
+    FileBlobStorageClient,
+)
+from faust_large_message_serializer.clients.cleaning_client import CleaningClient
+from faust_large_message_serializer.utils.uri_parser import URIParser
+
+
+class SmallBatchFileBlobStorageClient(FileBlobStorageClient):
+    MAX_DELETE_BATCH_SIZE = 2
+
+
+def test_delete_all_objects_of_topic(tmp_path):
+    reports = []
+    config = LargeMessageSerializerConfig(f"file://{tmp_path}/blobs", 0)
+    config._factory_client["file"] = SmallBatchFileBlobStorageClient
+    storing_client = config.create_storing_client()
+    for _ in range(5):
+        storing_client.store_bytes("topic", b"value", False)
+    storing_client.store_bytes("topic-2", b"value", False)
+
+    progress = config.create_cleaning_client(reports.append).delete_all_objects("topic")
+
+    assert (progress.listed, progress.deleted, progress.failed) == (5, 5, 0)
+    assert len(reports) == 3
+    assert reports[-1].deleted == 5
+    assert not os.listdir(tmp_path / "blobs" / "topic" / "values")
+    assert len(os.listdir(tmp_path / "blobs" / "topic-2" / "values")) == 1
+
+
+def test_delete_objects_older_than(tmp_path):
+    client = FileBlobStorageClient(str(tmp_path))
+    client.put_object(b"old", "bucket", "topic/values/old")
+    client.put_object(b"new", "bucket", "topic/values/new")
+    two_days_ago = time.time() - 2 * 24 * 60 * 60
+    os.utime(tmp_path / "bucket" / "topic" / "values" / "old", (two_days_ago,) * 2)
+    cleaning_client = CleaningClient(client, URIParser("file://bucket"))
+
+    progress = cleaning_client.delete_objects_older_than("topic", timedelta(days=1))
+
+    assert progress.deleted == 1
+    assert not client.object_exists("bucket", "topic/values/old")
+    assert client.object_exists("bucket", "topic/values/new")
@@ -0,0 +1,64 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from faust_large_message_serializer.clients.retrieving_client import RetrievingClient
+from faust_large_message_serializer.clients.storing_client import StoringClient
+from faust_large_message_serializer.compression.compressors import create_compressor
+from faust_large_message_serializer.utils.uri_parser import URIParser
+
+base_path = URIParser("s3://my-test-bucket")
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma"])
+def test_compressed_message_fits_inline(compression):
+    blob_client = MagicMock()
+    storing_client = StoringClient(
+        blob_client, base_path, 100, compressor=create_compressor(compression)
+    )
+    payload = b"Hello World" * 100
+
+    data = storing_client.store_bytes("test-serializer", payload, False)
+
+    assert data[0] & 0x01 == 0, "Compressed message should not be backed"
+    assert data[0] != 0, "Codec should be recorded in the flag"
+    blob_client.put_object.assert_not_called()
+    assert RetrievingClient(blob_client).retrieve_bytes(data) == payload
+
+
+def test_compressed_message_is_backed():
+    blobs = {}
+    blob_client = MagicMock()
+    blob_client.put_object.side_effect = (
+        lambda data, bucket, key: blobs.setdefault(f"s3://{bucket}/{key}", data)
+        and f"s3://{bucket}/{key}"
+    )
+    blob_client.get_object.side_effect = lambda bucket, key: blobs[
+        f"s3://{bucket}/{key}"
+    ]
+    storing_client = StoringClient(
+        blob_client, base_path, 0, compressor=create_compressor("zlib")
+    )
+    payload = b"Hello World" * 100
+
+    data = storing_client.store_bytes("test-serializer", payload, False)
+
+    assert data[0:1] == b"\x03"
+    assert len(next(iter(blobs.values()))) < len(payload), "Blob should be compressed"
+    assert RetrievingClient(blob_client).retrieve_bytes(data) == payload
+
+
+def test_incompressible_message_is_stored_uncompressed():
+    storing_client = StoringClient(
+        MagicMock(), base_path, 100, compressor=create_compressor("zlib")
+    )
+
+    assert storing_client.store_bytes("test-serializer", b"\x8f", False) == b"\x00\x8f"
+
+
+def test_unknown_compression():
+    with pytest.raises(ValueError):
+        create_compressor("snappy")
+
+    with pytest.raises(ValueError):
+        RetrievingClient(MagicMock()).retrieve_bytes(b"\x0eHello World")
@@ -0,0 +1,153 @@
+import os
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from faust_large_message_serializer.clients.retrieving_client import RetrievingClient
+from faust_large_message_serializer.clients.storing_client import StoringClient
+from faust_large_message_serializer.utils.delta import apply_delta, create_delta
+from faust_large_message_serializer.utils.envelope import is_delta
+from faust_large_message_serializer.utils.uri_parser import URIParser
+
+
+class DeltaStorage:
+    def __init__(self):
+        self.objects = {}
+        self.client = MagicMock()
+        self.client.put_object.side_effect = self.put_object
+        self.client.get_object.side_effect = lambda bucket, key: self.objects[key]
+
+    def put_object(self, data, bucket, key):
+        self.objects[key] = bytes(data)
+        return f"s3://{bucket}/{key}"
+
+
+def create_storing_client(storage, snapshot_interval, max_bytes=1000 * 1000):
+    return StoringClient(
+        storage.client,
+        URIParser("s3://bucket/base"),
+        200,
+        delta_snapshot_interval=snapshot_interval,
+        delta_max_bytes=max_bytes,
+    )
+
+
+def edit(data: bytes, position: int, replacement: bytes) -> bytes:
+    return data[:position] + replacement + data[position + len(replacement) :]
+
+
+@pytest.mark.parametrize(
+    "target",
+    [
+        lambda base: base,
+        lambda base: b"",
+        lambda base: edit(base, 100, b"changed"),
+        lambda base: base[:500] + os.urandom(300) + base[500:],
+        lambda base: base[:200] + base[900:],
+        lambda base: base[1000:] + base[:1000],
+        lambda base: os.urandom(len(base)),
+    ],
+)
+def test_apply_delta_restores_target(target):
+    base = os.urandom(2000)
+    target = target(base)
+
+    assert apply_delta(base, create_delta(base, target)) == target
+
+
+def test_delta_of_small_edit_is_small():
+    base = os.urandom(100000)
+    target = edit(edit(base, 1000, b"first"), 70000, b"second")
+
+    assert len(create_delta(base, target)) < 200
+
+
+def test_delta_exceeding_max_size_is_not_created():
+    base = os.urandom(100000)
+    target = edit(base, 1000, os.urandom(60000))
+
+    assert create_delta(base, target, 50000) is None
+    delta = create_delta(base, target, 70000)
+    assert apply_delta(base, delta) == target
+    assert create_delta(base, os.urandom(len(base)), 50000) is None
+
+
+def test_delta_of_rewritten_value_is_given_up_quickly():
+    base = os.urandom(8 * 1000 * 1000)
+    target = os.urandom(len(base))
+
+    start = time.perf_counter()
+    assert create_delta(base, target, len(target) // 2) is None
+    assert time.perf_counter() - start < 1
+
+
+def test_delta_of_large_value_with_many_edits_is_created():
+    base = os.urandom(1000 * 1000)
+    target = base
+    for position in range(0, len(base), 10000):
+        target = edit(target, position, b"changed")
+
+    delta = create_delta(base, target, len(target) // 2)
+
+    assert apply_delta(base, delta) == target
+
+
+def test_store_changelog_versions_as_deltas():
+    storage = DeltaStorage()
+    storing_client = create_storing_client(storage, 16)
+    retrieving_client = RetrievingClient(storage.client)
+    versions = [os.urandom(1000)]
+    versions += [edit(versions[0], 10 * i, b"version") for i in range(1, 4)]
+
+    messages = [
+        storing_client.store_bytes("topic", version, False, b"key")
+        for version in versions
+    ]
+
+    assert storage.client.put_object.call_count == 1
+    assert not is_delta(messages[0][0])
+    assert all(is_delta(message[0]) for message in messages[1:])
+    assert [retrieving_client.retrieve_bytes(m) for m in messages] == versions
+
+
+def test_store_snapshot_after_interval():
+    storage = DeltaStorage()
+    storing_client = create_storing_client(storage, 2)
+    base = os.urandom(1000)
+
+    messages = [
+        storing_client.store_bytes("topic", edit(base, i, b"x"), False, b"key")
+        for i in range(4)
+    ]
+
+    assert [is_delta(message[0]) for message in messages] == [
+        False,
+        True,
+        True,
+        False,
+    ]
+
+
+def test_store_full_version_if_delta_is_large():
+    storage = DeltaStorage()
+    storing_client = create_storing_client(storage, 16)
+
+    storing_client.store_bytes("topic", os.urandom(1000), False, b"key")
+    message = storing_client.store_bytes("topic", os.urandom(1000), False, b"key")
+
+    assert not is_delta(message[0])
+    assert storage.client.put_object.call_count == 2
+
+
+def test_store_without_record_key_or_over_memory_limit():
+    storage = DeltaStorage()
+    storing_client = create_storing_client(storage, 16, max_bytes=500)
+    base = os.urandom(1000)
+
+    storing_client.store_bytes("topic", base, False)
+    storing_client.store_bytes("topic", base, False, b"key")
+    message = storing_client.store_bytes("topic", base, False, b"key")
+
+    assert not is_delta(message[0])
+    assert storage.client.put_object.call_count == 3
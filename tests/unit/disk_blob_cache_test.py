@@ -0,0 +1,97 @@
+import mmap
+import os
+
+from faust_large_message_serializer.cache.disk_blob_cache import DiskBlobCache
+from faust_large_message_serializer.cache.memory_blob_cache import MemoryBlobCache
+from faust_large_message_serializer.cache.tiered_blob_cache import TieredBlobCache
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskBlobCache(str(tmp_path), max_bytes=100)
+    cache.put("s3://bucket/topic/values/id", b"Hello World")
+
+    data = cache.get("s3://bucket/topic/values/id")
+
+    assert isinstance(data, memoryview), "Hits should be memory mapped"
+    assert bytes(data) == b"Hello World"
+    assert cache.get("s3://bucket/topic/values/other") is None
+
+
+def test_disk_cache_is_shared_between_instances(tmp_path):
+    DiskBlobCache(str(tmp_path), max_bytes=100).put("s3://bucket/id", b"Hello World")
+
+    data = DiskBlobCache(str(tmp_path), max_bytes=100).get("s3://bucket/id")
+
+    assert bytes(data) == b"Hello World", "Cache should survive restarts"
+
+
+def test_disk_cache_evicts_oldest_files(tmp_path):
+    cache = DiskBlobCache(str(tmp_path), max_bytes=10)
+    cache.put("s3://bucket/a", b"aaaa")
+    cache.put("s3://bucket/b", b"bbbb")
+    for name in os.listdir(tmp_path):
+        for file in os.listdir(tmp_path / name):
+            os.utime(tmp_path / name / file, (0, 0))
+    cache.get("s3://bucket/a")
+    cache.put("s3://bucket/c", b"cccc")
+
+    assert cache.get("s3://bucket/a") is not None
+    assert (
+        cache.get("s3://bucket/b") is None
+    ), "Least recently used blob should be evicted"
+    assert cache.get("s3://bucket/c") is not None
+
+
+def test_disk_cache_evicts_below_limit(tmp_path):
+    cache = DiskBlobCache(str(tmp_path), max_bytes=100)
+    for index in range(11):
+        cache.put(f"s3://bucket/{index}", b"x" * 10)
+
+    assert sum(cache.get(f"s3://bucket/{i}") is not None for i in range(11)) == 9
+
+
+def test_disk_cache_ignores_write_errors(tmp_path, monkeypatch):
+    cache = DiskBlobCache(str(tmp_path), max_bytes=100)
+
+    def fail(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "replace", fail)
+    cache.put("s3://bucket/id", b"Hello World")
+
+    assert cache.get("s3://bucket/id") is None
+    assert not [name for _, _, files in os.walk(tmp_path) for name in files]
+
+
+def test_disk_cache_read_errors_are_misses(tmp_path, monkeypatch):
+    cache = DiskBlobCache(str(tmp_path), max_bytes=100)
+    cache.put("s3://bucket/id", b"Hello World")
+
+    def fail(*args, **kwargs):
+        raise OSError(12, "Cannot allocate memory")
+
+    monkeypatch.setattr(mmap, "mmap", fail)
+
+    assert cache.get("s3://bucket/id") is None
+
+
+def test_disk_cache_hits_survive_touch_errors(tmp_path, monkeypatch):
+    cache = DiskBlobCache(str(tmp_path), max_bytes=100)
+    cache.put("s3://bucket/id", b"Hello World")
+
+    def fail(*args, **kwargs):
+        raise PermissionError(13, "Permission denied")
+
+    monkeypatch.setattr(os, "utime", fail)
+
+    assert cache.get("s3://bucket/id") == b"Hello World"
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    memory_cache = MemoryBlobCache(max_bytes=100)
+    disk_cache = DiskBlobCache(str(tmp_path), max_bytes=100)
+    disk_cache.put("s3://bucket/id", b"Hello World")
+    cache = TieredBlobCache([memory_cache, disk_cache])
+
+    assert bytes(cache.get("s3://bucket/id")) == b"Hello World"
+    assert bytes(memory_cache.get("s3://bucket/id")) == b"Hello World"
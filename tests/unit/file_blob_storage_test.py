@@ -0,0 +1,61 @@
+import io
+import os
+
+from faust_large_message_serializer import LargeMessageSerializerConfig
+from faust_large_message_serializer.blob_storage.file_blob_storage import (
+    FileBlobStorageClient,
+)
+from faust_large_message_serializer.serializer import LargeMessageSerializer
+
+
+def test_file_serializer_round_trip(tmp_path):
+    config = LargeMessageSerializerConfig(f"file://{tmp_path}/blobs", 0)
+    serializer = LargeMessageSerializer("test-serializer", config)
+    binary_input = b"This is a test for a backed message"
+
+    file_uri = serializer.dumps(binary_input)
+
+    assert file_uri.startswith(
+        f"\x01file://{tmp_path}/blobs/test-serializer/values/".encode()
+    )
+    assert binary_input == serializer.loads(file_uri)
+    assert not any(
+        name.startswith(FileBlobStorageClient.TEMP_PREFIX)
+        for name in os.listdir(tmp_path / "blobs" / "test-serializer" / "values")
+    ), "Temporary files should be renamed"
+
+
+def test_file_client_delete_all(tmp_path):
+    client = FileBlobStorageClient(str(tmp_path))
+    client.put_object(b"Test 1", "bucket", "foo/first_test.txt")
+    client.put_object(b"Test 2", "bucket", "foo/second_test.txt")
+    client.put_object(b"Test 3", "bucket", "bar/third_test.txt")
+    client.put_object(b"Test 4", "bucket", "bar/fourth_test.txt")
+
+    client.delete_all_objects("bucket", "foo")
+    assert not client.object_exists("bucket", "foo/first_test.txt")
+    assert not client.object_exists("bucket", "foo/second_test.txt")
+    assert bytes(client.get_object("bucket", "bar/third_test.txt")) == b"Test 3"
+
+    client.delete_all_objects("bucket", "bar/th")
+    assert not client.object_exists("bucket", "bar/third_test.txt")
+    assert client.object_exists("bucket", "bar/fourth_test.txt")
+
+
+def test_file_stream_round_trip(tmp_path):
+    config = LargeMessageSerializerConfig(f"file://{tmp_path}/blobs", 10)
+    storing_client = config.create_storing_client()
+    retrieving_client = config.create_retrieving_client()
+    payload = os.urandom(1000)
+
+    backed = storing_client.store_stream("topic", io.BytesIO(payload), False)
+    inline = storing_client.store_stream("topic", io.BytesIO(b"small"), False)
+
+    assert backed[0:1] == b"\x01"
+    assert inline == b"\x00small"
+    stream = retrieving_client.retrieve_stream(backed)
+    chunks = list(iter(lambda: stream.read(100), b""))
+    stream.close()
+    assert len(chunks) == 10
+    assert b"".join(chunks) == payload
+    assert retrieving_client.retrieve_stream(inline).read() == b"small"
@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+from faust_large_message_serializer.cache.memory_blob_cache import MemoryBlobCache
+from faust_large_message_serializer.clients.retrieving_client import RetrievingClient
+from faust_large_message_serializer.clients.storing_client import StoringClient
+from faust_large_message_serializer.instrumentation.instrumentation import (
+    CompositeInstrumentation,
+)
+from faust_large_message_serializer.instrumentation.metrics_instrumentation import (
+    MetricsInstrumentation,
+)
+from faust_large_message_serializer.instrumentation.monitor_instrumentation import (
+    MonitorInstrumentation,
+)
+from faust_large_message_serializer.instrumentation.tracing_instrumentation import (
+    TracingInstrumentation,
+)
+from faust_large_message_serializer.utils.uri_parser import URIParser
+
+
+def create_blob_client():
+    blobs = {}
+    blob_client = MagicMock()
+    blob_client.put_object.side_effect = (
+        lambda data, bucket, key: blobs.setdefault(f"s3://{bucket}/{key}", data)
+        and f"s3://{bucket}/{key}"
+    )
+    blob_client.get_object.side_effect = lambda bucket, key: blobs[
+        f"s3://{bucket}/{key}"
+    ]
+    return blob_client
+
+
+def test_metrics_instrumentation():
+    metrics = MetricsInstrumentation()
+    blob_client = create_blob_client()
+    storing_client = StoringClient(
+        blob_client, URIParser("s3://bucket"), 5, instrumentation=metrics
+    )
+    retrieving_client = RetrievingClient(
+        blob_client, cache=MemoryBlobCache(100), instrumentation=metrics, topic="topic"
+    )
+
+    backed = storing_client.store_bytes("topic", b"Hello World", False)
+    inline = storing_client.store_bytes("topic", b"Hi", False)
+    for data in (backed, backed, inline):
+        retrieving_client.retrieve_bytes(data)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["stored_backed_messages", "topic"] == 1
+    assert snapshot["stored_inline_messages", "topic"] == 1
+    assert snapshot["uploaded_bytes", "topic"] == 11
+    assert snapshot["upload_seconds", "topic"]["count"] == 1
+    assert snapshot["retrieved_backed_messages", "topic"] == 2
+    assert snapshot["retrieved_inline_messages", "topic"] == 1
+    assert snapshot["downloaded_bytes", "topic"] == 11
+    assert snapshot["cache_misses", "topic"] == 1
+    assert snapshot["cache_hits", "topic"] == 1
+    assert snapshot["stored_backed_size", "topic"]["sum"] == 11
+
+
+def test_monitor_and_tracing_instrumentation():
+    monitor = MagicMock()
+    spans = []
+
+    @contextmanager
+    def start_span(name, attributes):
+        spans.append((name, attributes))
+        yield
+
+    instrumentation = CompositeInstrumentation(
+        [MonitorInstrumentation(monitor), TracingInstrumentation(start_span)]
+    )
+    storing_client = StoringClient(
+        create_blob_client(),
+        URIParser("s3://bucket"),
+        5,
+        instrumentation=instrumentation,
+    )
+
+    storing_client.store_bytes("topic", b"Hello World", False)
+
+    monitor.count.assert_any_call("large_message.topic.stored_backed_messages", 1)
+    monitor.count.assert_any_call("large_message.topic.uploaded_bytes", 11)
+    assert spans == [
+        ("large_message.store", {"topic": "topic"}),
+        ("large_message.upload", {"topic": "topic", "size": 11}),
+    ]
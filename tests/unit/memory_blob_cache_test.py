@@ -0,0 +1,53 @@
+from unittest.mock import MagicMock
+
+from faust_large_message_serializer.cache.memory_blob_cache import MemoryBlobCache
+from faust_large_message_serializer.clients.retrieving_client import RetrievingClient
+
+
+def test_cache_evicts_least_recently_used_by_size():
+    cache = MemoryBlobCache(max_bytes=10)
+    cache.put("s3://bucket/a", b"aaaa")
+    cache.put("s3://bucket/b", b"bbbb")
+    cache.get("s3://bucket/a")
+    cache.put("s3://bucket/c", b"cccc")
+
+    assert cache.get("s3://bucket/a") == b"aaaa"
+    assert (
+        cache.get("s3://bucket/b") is None
+    ), "Least recently used blob should be evicted"
+    assert cache.get("s3://bucket/c") == b"cccc"
+    assert cache.size == 8
+
+
+def test_cache_skips_blobs_larger_than_budget():
+    cache = MemoryBlobCache(max_bytes=3)
+    cache.put("s3://bucket/a", b"aaaa")
+
+    assert cache.get("s3://bucket/a") is None
+    assert cache.size == 0
+
+
+def test_cache_expires_entries_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(
+        "faust_large_message_serializer.cache.memory_blob_cache.time.monotonic",
+        lambda: now[0],
+    )
+    cache = MemoryBlobCache(max_bytes=10, ttl=5)
+    cache.put("s3://bucket/a", b"aaaa")
+    now[0] += 6
+
+    assert cache.get("s3://bucket/a") is None
+    assert cache.size == 0
+
+
+def test_retrieving_client_uses_cache():
+    blob_client = MagicMock()
+    blob_client.get_object.return_value = b"Hello World"
+    retrieving_client = RetrievingClient(blob_client, cache=MemoryBlobCache(100))
+
+    for _ in range(3):
+        data = retrieving_client.retrieve_bytes(b"\x01s3://my-bucket/topic/values/id")
+        assert data == b"Hello World"
+
+    blob_client.get_object.assert_called_once_with("my-bucket", "topic/values/id")
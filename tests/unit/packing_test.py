@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from faust_large_message_serializer.clients.retrieving_client import RetrievingClient
+from faust_large_message_serializer.clients.storing_client import StoringClient
+from faust_large_message_serializer.utils.pointer import decode_pointer
+from faust_large_message_serializer.utils.uri_parser import URIParser
+
+
+class PackStorage:
+    def __init__(self):
+        self.objects = {}
+        self.client = MagicMock()
+        self.client.put_object.side_effect = self.put_object
+        self.client.get_object.side_effect = lambda bucket, key: self.objects[key]
+        self.client.get_object_range.side_effect = (
+            lambda bucket, key, start, end: self.objects[key][start:end]
+        )
+
+    def put_object(self, data, bucket, key):
+        self.objects[key] = bytes(data)
+        return f"s3://{bucket}/{key}"
+
+
+def create_storing_client(storage, pack_max_bytes):
+    return StoringClient(
+        storage.client, URIParser("s3://bucket/base"), 10, pack_max_bytes=pack_max_bytes
+    )
+
+
+def test_store_many_packs_backed_payloads():
+    storage = PackStorage()
+    storing_client = create_storing_client(storage, 100)
+    datas = [b"a" * 40, b"small", b"b" * 40, None, b"c" * 40]
+
+    results = storing_client.store_many("topic", datas, False)
+
+    assert storage.client.put_object.call_count == 2
+    assert results[1] == b"\x00small"
+    assert results[3] is None
+    first, second, third = (decode_pointer(results[i]) for i in (0, 2, 4))
+    assert first.uri == second.uri != third.uri
+    assert (first.offset, first.size) == (0, 40)
+    assert (second.offset, second.size) == (40, 40)
+    assert third.offset is None
+
+
+def test_store_many_without_packing_uploads_each_payload():
+    storage = PackStorage()
+    storing_client = create_storing_client(storage, 0)
+
+    storing_client.store_many("topic", [b"a" * 40, b"b" * 40], False)
+
+    assert storage.client.put_object.call_count == 2
+
+
+def test_retrieve_packed_payload_with_range_request():
+    storage = PackStorage()
+    results = create_storing_client(storage, 100).store_many(
+        "topic", [b"a" * 40, b"b" * 40], False
+    )
+    retrieving_client = RetrievingClient(storage.client)
+
+    assert retrieving_client.retrieve_bytes(results[1]) == b"b" * 40
+    storage.client.get_object.assert_not_called()
+    storage.client.get_object_range.assert_called_once()
+
+
+def test_retrieve_many_downloads_shared_pack_once():
+    storage = PackStorage()
+    datas = [b"a" * 40, b"b" * 40, b"inline", b"c" * 20]
+    results = create_storing_client(storage, 100).store_many("topic", datas, False)
+    retrieving_client = RetrievingClient(
+        storage.client, ThreadPoolExecutor(max_workers=2)
+    )
+
+    assert retrieving_client.retrieve_many(results) == datas
+    storage.client.get_object.assert_called_once()
+    storage.client.get_object_range.assert_not_called()
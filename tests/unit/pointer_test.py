@@ -0,0 +1,75 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from faust_large_message_serializer.clients.retrieving_client import RetrievingClient
+from faust_large_message_serializer.clients.storing_client import StoringClient
+from faust_large_message_serializer.utils.pointer import decode_pointer
+from faust_large_message_serializer.utils.uri_parser import URIParser
+
+
+def create_clients(**kwargs):
+    blobs = {}
+
+    def put_object(data, bucket, key):
+        blobs[key] = data
+        return f"s3://{bucket}/{key}"
+
+    blob_client = MagicMock()
+    blob_client.put_object.side_effect = put_object
+    blob_client.get_object.side_effect = lambda bucket, key: blobs[key]
+    blob_client.get_sized_object.side_effect = lambda bucket, key, size: blobs[key]
+    blob_client.object_exists.return_value = False
+    storing_client = StoringClient(
+        blob_client, URIParser("s3://my-bucket/path"), 0, **kwargs
+    )
+    return storing_client, RetrievingClient(blob_client), blobs
+
+
+@pytest.mark.parametrize("content_addressed", [False, True])
+def test_compact_pointer_round_trip(content_addressed):
+    storing_client, retrieving_client, blobs = create_clients(
+        compact_pointers=True,
+        pointer_checksums=True,
+        content_addressed=content_addressed,
+        key_shards=4,
+    )
+
+    data = storing_client.store_bytes("topic", b"Hello World", False)
+    pointer = decode_pointer(data)
+
+    assert data[0] == 0x11
+    assert pointer.uri == f"s3://my-bucket/{pointer.key}"
+    assert pointer.bucket == "my-bucket"
+    assert list(blobs) == [pointer.key]
+    assert pointer.size == len(b"Hello World")
+    assert retrieving_client.retrieve_bytes(data) == b"Hello World"
+
+
+def test_compact_pointer_is_smaller_than_uri():
+    storing_client, _, _ = create_clients()
+    compact_storing_client, _, _ = create_clients(compact_pointers=True)
+
+    uri_data = storing_client.store_bytes("topic", b"Hello World", False)
+    compact_data = compact_storing_client.store_bytes("topic", b"Hello World", False)
+
+    assert len(compact_data) < len(uri_data)
+
+
+def test_legacy_pointer_is_decoded():
+    pointer = decode_pointer(b"\x01s3://my-bucket/topic/values/id")
+
+    assert pointer.bucket == "my-bucket"
+    assert pointer.key == "topic/values/id"
+    assert pointer.size is None
+
+
+def test_checksum_mismatch_is_detected():
+    storing_client, retrieving_client, blobs = create_clients(
+        compact_pointers=True, pointer_checksums=True
+    )
+    data = storing_client.store_bytes("topic", b"Hello World", False)
+    blobs[decode_pointer(data).key] = b"Hello Earth"
+
+    with pytest.raises(ValueError):
+        retrieving_client.retrieve_bytes(data)
@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import zlib
+
+import pytest
+
+from faust_large_message_serializer import LargeMessageSerializerConfig
+from faust_large_message_serializer.clients.retrieving_client import RetrievingClient
+from faust_large_message_serializer.utils.process_offload import (
+    ProcessOffload,
+    content_hash,
+)
+
+
+def get_process(data):
+    return os.getpid(), multiprocessing.get_start_method()
+
+
+@pytest.fixture(scope="module")
+def offload():
+    process_offload = ProcessOffload(max_workers=1, threshold=1000)
+    yield process_offload
+    process_offload.shutdown()
+
+
+def test_large_payloads_are_transformed_in_process_pool(offload):
+    data = b"Hello World" * 1000
+    compressed = offload.run(zlib.compress, data)
+
+    assert compressed == zlib.compress(data)
+    assert offload.run(zlib.decompress, compressed) == data
+    assert offload.run(zlib.crc32, data) == zlib.crc32(data)
+    assert offload.run(content_hash, data, 16) == content_hash(data, 16)
+
+
+def test_small_payloads_are_transformed_inline(offload):
+    assert offload.run(lambda data: os.getpid(), b"small") == os.getpid()
+
+
+def test_workers_are_spawned(offload):
+    pid, start_method = offload.run(get_process, b"x" * 1000)
+
+    assert pid != os.getpid()
+    assert start_method == "spawn"
+
+
+def test_payloads_expected_to_grow_are_offloaded(offload):
+    pid, _ = offload.run(get_process, b"small", expected_size=1000)
+
+    assert pid != os.getpid()
+
+
+def test_offloaded_round_trip(tmp_path):
+    config = LargeMessageSerializerConfig(
+        f"file://{tmp_path}/blobs",
+        100,
+        large_message_compression="zlib",
+        large_message_compact_pointers=True,
+        large_message_pointer_checksums=True,
+        large_message_process_pool_workers=1,
+        large_message_process_offload_threshold=1000,
+    )
+    payload = os.urandom(100) * 100
+
+    data = config.create_storing_client().store_bytes("topic", payload, False)
+
+    assert config.create_retrieving_client().retrieve_bytes(data) == payload
+
+
+def test_small_payloads_decompressing_to_large_ones_are_offloaded(tmp_path):
+    offload = ProcessOffload(max_workers=1, threshold=1000)
+    calls = []
+    original_run = offload.run
+
+    def run(function, data, *args, expected_size=None):
+        calls.append((len(data), expected_size))
+        return original_run(function, data, *args, expected_size=expected_size)
+
+    offload.run = run
+    config = LargeMessageSerializerConfig(
+        f"file://{tmp_path}/blobs", 100000, large_message_compression="zlib"
+    )
+    payload = b"Hello World" * 1000
+    data = config.create_storing_client().store_bytes("topic", payload, False)
+    client = RetrievingClient(None, offload=offload)
+
+    try:
+        assert client.retrieve_bytes(data) == payload
+        assert client.retrieve_bytes(data) == payload
+    finally:
+        offload.shutdown()
+
+    compressed_size = calls[0][0]
+    assert compressed_size < 1000
+    assert calls[1] == (compressed_size, len(payload))
+
+
+class RecordingOffload:
+    def __init__(self):
+        self.expected_sizes = []
+
+    def run(self, function, data, *args, expected_size=None):
+        self.expected_sizes.append(expected_size)
+        return function(data, *args)
+
+
+def test_decompression_ratio_estimate_follows_recent_payloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(RetrievingClient, "DECOMPRESSION_RATIO_WINDOW", 2)
+    config = LargeMessageSerializerConfig(
+        f"file://{tmp_path}/blobs", 1000000, large_message_compression="zlib"
+    )
+    storing_client = config.create_storing_client()
+    compressible = storing_client.store_bytes("topic", b"a" * 100000, False)
+    payloads = [os.urandom(500) * 2 for _ in range(3)]
+    offload = RecordingOffload()
+    client = RetrievingClient(None, offload=offload)
+
+    client.retrieve_bytes(compressible)
+    for payload in payloads:
+        data = storing_client.store_bytes("topic", payload, False)
+        assert client.retrieve_bytes(data) == payload
+
+    assert offload.expected_sizes[1] > 100000
+    assert offload.expected_sizes[3] < 2000
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+from faust.serializers import codecs
+from faust.utils import json as faust_json
+
+from faust_large_message_serializer import (
+    LargeMessageSerializer,
+    LargeMessageSerializerConfig,
+)
+from faust_large_message_serializer.cache.memory_blob_cache import MemoryBlobCache
+from faust_large_message_serializer.clients.retrieving_client import RetrievingClient
+
+
+def test_retrieve_not_backed_bytes():
+    blob_client = MagicMock()
+    retrieving_client = RetrievingClient(blob_client)
+
+    assert retrieving_client.retrieve_bytes(b"\x00Hello World") == b"Hello World"
+    blob_client.get_object.assert_not_called()
+
+
+def test_retrieve_backed_bytes():
+    blob_client = MagicMock()
+    blob_client.get_object.return_value = b"Hello World"
+    retrieving_client = RetrievingClient(blob_client)
+
+    data = retrieving_client.retrieve_bytes(b"\x01s3://my-bucket/topic/values/id")
+
+    assert data == b"Hello World"
+    blob_client.get_object.assert_called_once_with("my-bucket", "topic/values/id")
+
+
+def test_retrieved_bytes_do_not_share_cached_buffers():
+    blob_client = MagicMock()
+    blob_client.get_object.return_value = bytearray(b"Hello World")
+    retrieving_client = RetrievingClient(
+        blob_client, ThreadPoolExecutor(max_workers=1), MemoryBlobCache(1000)
+    )
+    datas = [b"\x01s3://my-bucket/first", b"\x01s3://my-bucket/second"]
+
+    data = retrieving_client.retrieve_bytes(datas[0])
+    batch = retrieving_client.retrieve_many(datas)
+
+    assert isinstance(data, bytes)
+    assert all(isinstance(entry, bytes) for entry in batch)
+    assert retrieving_client.retrieve_bytes(datas[0]) == b"Hello World"
+
+
+def test_retrieve_backed_bytes_async_runs_on_executor():
+    blob_client = MagicMock()
+    blob_client.get_object.return_value = b"Hello World"
+    executor = ThreadPoolExecutor(max_workers=1)
+    retrieving_client = RetrievingClient(blob_client, executor)
+
+    data = asyncio.run(
+        retrieving_client.retrieve_bytes_async(b"\x01s3://my-bucket/topic/values/id")
+    )
+
+    assert data == b"Hello World"
+    blob_client.get_object.assert_called_once_with("my-bucket", "topic/values/id")
+    executor.shutdown()
+
+
+def test_retrieve_many_keeps_order():
+    blob_client = MagicMock()
+    blob_client.get_object.side_effect = lambda bucket, key: key.encode()
+    retrieving_client = RetrievingClient(blob_client, ThreadPoolExecutor(max_workers=4))
+    datas = [
+        b"\x01s3://my-bucket/first",
+        b"\x00inline",
+        None,
+        b"\x01s3://my-bucket/second",
+    ]
+
+    assert retrieving_client.retrieve_many(datas) == [
+        b"first",
+        b"inline",
+        None,
+        b"second",
+    ]
+    assert asyncio.run(retrieving_client.retrieve_many_async(datas)) == [
+        b"first",
+        b"inline",
+        None,
+        b"second",
+    ]
+    assert blob_client.get_object.call_count == 4
+
+
+def test_retrieve_many_without_executor_reuses_one_pool():
+    threads = set()
+    blob_client = MagicMock()
+
+    def get_object(bucket, key):
+        threads.add(threading.current_thread())
+        return key.encode()
+
+    blob_client.get_object.side_effect = get_object
+    retrieving_client = RetrievingClient(blob_client)
+    datas = [f"\x01s3://my-bucket/{index}".encode() for index in range(20)]
+
+    for _ in range(5):
+        assert retrieving_client.retrieve_many(datas) == [
+            str(index).encode() for index in range(20)
+        ]
+
+    assert len(threads) <= RetrievingClient.DEFAULT_MAX_WORKERS
+    assert all(thread.name.startswith("large-message-io") for thread in threads)
+
+
+class JoinCountingLock:
+    """Lock of a SingleFlight that signals once ``callers`` calls have joined."""
+
+    def __init__(self, callers: int):
+        self._lock = threading.Lock()
+        self._callers = callers
+        self._joined = 0
+        self.all_joined = threading.Event()
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc_info):
+        self._joined += 1
+        if self._joined == self._callers:
+            self.all_joined.set()
+        self._lock.release()
+
+
+def test_concurrent_retrievals_of_same_blob_share_download():
+    release = threading.Event()
+
+    def get_object(bucket, key):
+        release.wait(timeout=5)
+        return b"Hello World"
+
+    blob_client = MagicMock()
+    blob_client.get_object.side_effect = get_object
+    retrieving_client = RetrievingClient(blob_client)
+    # every caller leaves the lock once it has joined the download
+    lock = JoinCountingLock(4)
+    retrieving_client._single_flight._lock = lock
+    executor = ThreadPoolExecutor(max_workers=4)
+
+    futures = [
+        executor.submit(retrieving_client.retrieve_bytes, b"\x01s3://my-bucket/id")
+        for _ in range(4)
+    ]
+    assert lock.all_joined.wait(timeout=5)
+    release.set()
+
+    assert [future.result(timeout=5) for future in futures] == [b"Hello World"] * 4
+    blob_client.get_object.assert_called_once_with("my-bucket", "id")
+    executor.shutdown()
+
+
+def test_retrieve_view_does_not_copy_inline_payload():
+    data = bytearray(b"\x00Hello World")
+    retrieving_client = RetrievingClient(MagicMock())
+
+    view = retrieving_client.retrieve_view(data)
+    data[1:6] = b"HELLO"
+
+    assert isinstance(view, memoryview)
+    assert view == b"HELLO World"
+
+
+def test_zero_copy_loads_with_json_codec():
+    pytest.importorskip("orjson")
+    config = LargeMessageSerializerConfig(
+        "s3://my-bucket", 1000, large_message_zero_copy_loads=True
+    )
+    serializer = codecs.get_codec("json") | LargeMessageSerializer("topic", config)
+
+    assert serializer.loads(serializer.dumps({"key": "value"})) == {"key": "value"}
+
+
+def test_zero_copy_loads_fall_back_to_bytes_without_orjson(monkeypatch):
+    monkeypatch.setattr(faust_json, "orjson", None)
+    monkeypatch.setattr(faust_json, "loads", lambda s, **kwargs: json.loads(s))
+    monkeypatch.setattr(faust_json, "dumps", lambda obj, **kwargs: json.dumps(obj))
+    config = LargeMessageSerializerConfig(
+        "s3://my-bucket", 1000, large_message_zero_copy_loads=True
+    )
+    serializer = codecs.get_codec("json") | LargeMessageSerializer("topic", config)
+
+    assert serializer.loads(serializer.dumps({"key": "value"})) == {"key": "value"}
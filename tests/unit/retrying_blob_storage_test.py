@@ -0,0 +1,125 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from faust_large_message_serializer.blob_storage.amazon_blob_storage import (
+    AmazonS3Client,
+)
+from faust_large_message_serializer.blob_storage.retrying_blob_storage import (
+    RetryingBlobStorageClient,
+    RetryPolicy,
+)
+from faust_large_message_serializer.instrumentation.metrics_instrumentation import (
+    MetricsInstrumentation,
+)
+
+no_delay = RetryPolicy(max_attempts=3, base_delay=0)
+
+
+def client_error(code, status):
+    return ClientError(
+        {"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        "GetObject",
+    )
+
+
+def test_throttled_requests_are_retried():
+    s3_client = MagicMock()
+    s3_client.head_object.side_effect = [client_error("SlowDown", 503), {}]
+    instrumentation = MetricsInstrumentation()
+    client = RetryingBlobStorageClient(
+        AmazonS3Client(s3_client), no_delay, instrumentation
+    )
+
+    assert client.object_exists("bucket", "key")
+    assert s3_client.head_object.call_count == 2
+    assert instrumentation.snapshot()["object_exists_retries", None] == 1
+
+
+def test_other_errors_are_not_retried():
+    s3_client = MagicMock()
+    s3_client.head_object.side_effect = client_error("AccessDenied", 403)
+    client = RetryingBlobStorageClient(AmazonS3Client(s3_client), no_delay)
+
+    with pytest.raises(ClientError):
+        client.object_exists("bucket", "key")
+    assert s3_client.head_object.call_count == 1
+
+
+def test_retries_are_limited():
+    blob_client = MagicMock()
+    blob_client.get_object.side_effect = TimeoutError()
+    blob_client.is_retryable.return_value = True
+    client = RetryingBlobStorageClient(blob_client, no_delay)
+
+    with pytest.raises(TimeoutError):
+        client.get_object("bucket", "key")
+    assert blob_client.get_object.call_count == 3
+
+
+def create_hedging_client(get_object, instrumentation=None):
+    blob_client = MagicMock()
+    blob_client.get_object.side_effect = get_object
+    return RetryingBlobStorageClient(
+        blob_client,
+        no_delay,
+        instrumentation,
+        hedge_percentile=90,
+        hedge_max_size=1000,
+    )
+
+
+def test_slow_get_is_hedged():
+    release = threading.Event()
+    calls = []
+
+    def get_object(bucket, key):
+        calls.append(key)
+        if key == "slow" and len(calls) == 21:
+            release.wait(5)
+            return b"slow"
+        return b"fast"
+
+    instrumentation = MetricsInstrumentation()
+    client = create_hedging_client(get_object, instrumentation)
+    for _ in range(20):
+        client.get_sized_object("bucket", "fast", 4)
+
+    assert client.get_sized_object("bucket", "slow", 4) == b"fast"
+    assert instrumentation.snapshot()["get_object_hedges", None] == 1
+    release.set()
+
+
+def test_hedge_delay_depends_on_size():
+    def get_object(bucket, key):
+        # small blobs are fast, so the first large download must not be hedged
+        if key == "large":
+            time.sleep(0.05)
+            return b"x" * 500
+        return b"x"
+
+    instrumentation = MetricsInstrumentation()
+    client = create_hedging_client(get_object, instrumentation)
+    for _ in range(20):
+        client.get_sized_object("bucket", "small", 1)
+
+    assert len(client.get_sized_object("bucket", "large", 500)) == 500
+    assert ("get_object_hedges", None) not in instrumentation.snapshot()
+
+
+def test_large_or_unsized_gets_are_not_hedged():
+    calls = []
+
+    def get_object(bucket, key):
+        calls.append(key)
+        return b"x" * 2000
+
+    client = create_hedging_client(get_object)
+    for _ in range(20):
+        client.get_object("bucket", "unsized")
+    client.get_sized_object("bucket", "large", 2000)
+
+    assert calls == ["unsized"] * 20 + ["large"]
@@ -1,3 +1,4 @@
+import asyncio
 from unittest.mock import MagicMock
 
 import pytest
@@ -59,3 +60,69 @@ def test_base_path_should_defined_when_backed(monkeypatch, config_serializer):
     ), "Base path should exists when backed procedure was called"
 
     blob_client.put_object.assert_not_called()
+
+
+def test_store_bytes_async_should_be_backed(monkeypatch, config_serializer):
+
+    blob_client = MagicMock(specs=BlobStorageClient)
+    blob_client.put_object.return_value = "s3://my-test-bucket/test/values/id"
+
+    storing_client = StoringClient(blob_client, config_serializer.base_path, 0)
+
+    data = asyncio.run(
+        storing_client.store_bytes_async("test-serializer", b"Hello World", False)
+    )
+
+    assert data == b"\x01s3://my-test-bucket/test/values/id"
+    blob_client.put_object.assert_called_once()
+
+
+def test_content_addressed_storing_should_skip_duplicate_uploads(config_serializer):
+
+    blob_client = MagicMock(specs=BlobStorageClient)
+    blob_client.object_exists.return_value = False
+    blob_client.put_object.side_effect = (
+        lambda data, bucket, key: f"s3://{bucket}/{key}"
+    )
+
+    storing_client = StoringClient(
+        blob_client, config_serializer.base_path, 0, content_addressed=True
+    )
+
+    first = storing_client.store_bytes("test-serializer", b"Hello World", False)
+    second = storing_client.store_bytes("test-serializer", b"Hello World", False)
+    other = storing_client.store_bytes("test-serializer", b"Hello Faust", False)
+
+    assert first == second, "Equal payloads should share a blob"
+    assert first != other
+    assert blob_client.put_object.call_count == 2
+
+
+def test_content_addressed_storing_should_skip_existing_objects(config_serializer):
+
+    blob_client = MagicMock(specs=BlobStorageClient)
+    blob_client.object_exists.return_value = True
+
+    storing_client = StoringClient(
+        blob_client, config_serializer.base_path, 0, content_addressed=True
+    )
+
+    data = storing_client.store_bytes("test-serializer", b"Hello World", False)
+
+    assert data.startswith(b"\x01s3://my-test-bucket/test-serializer/values/")
+    blob_client.put_object.assert_not_called()
+
+
+def test_sharded_keys_should_be_spread_over_prefixes(config_serializer):
+    blob_client = MagicMock()
+    storing_client = StoringClient(
+        blob_client, config_serializer.base_path, 0, key_shards=16
+    )
+
+    for _ in range(200):
+        storing_client.store_bytes("test-serializer", b"Hello World", False)
+
+    keys = [call.args[2] for call in blob_client.put_object.call_args_list]
+    shards = {key.split("/")[2] for key in keys}
+    assert all(key.startswith("test-serializer/values/") for key in keys)
+    assert shards == {f"{shard:x}" for shard in range(16)}
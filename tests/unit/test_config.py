@@ -1,8 +1,24 @@
+import subprocess
+import sys
 from unittest.mock import MagicMock
 
+import pytest
+
+from faust_large_message_serializer.blob_storage import registry
+from faust_large_message_serializer.blob_storage.registry import register_backend
+from faust_large_message_serializer.blob_storage.shared_clients import (
+    clear_shared_clients,
+)
 from faust_large_message_serializer.config import LargeMessageSerializerConfig
 
 
+@pytest.fixture(autouse=True)
+def shared_clients():
+    clear_shared_clients()
+    yield
+    clear_shared_clients()
+
+
 def test_config_callback(monkeypatch):
     bucket_name = "my-test-bucket"
     base_path = f"s3://{bucket_name}"
@@ -22,7 +38,7 @@ def test_config_callback(monkeypatch):
         large_message_blob_storage_custom_config=config_callback,
     )
     monkeypatch.setattr(
-        "faust_large_message_serializer.config.boto3.client",
+        "faust_large_message_serializer.blob_storage.amazon_blob_storage.boto3.client",
         s3_client_mock,
     )
     config.create_storing_client()
@@ -39,7 +55,7 @@ def test_blob_client_cache(monkeypatch):
     region = "us-east-1"
     s3_client_mock = MagicMock(return_value=MagicMock())
     monkeypatch.setattr(
-        "faust_large_message_serializer.config.boto3.client",
+        "faust_large_message_serializer.blob_storage.amazon_blob_storage.boto3.client",
         s3_client_mock,
     )
     config = LargeMessageSerializerConfig(
@@ -53,3 +69,67 @@ def test_blob_client_cache(monkeypatch):
         config.create_retrieving_client()._client
         == config.create_retrieving_client()._client
     ), "Client should be cached"
+
+
+def test_registered_backend(monkeypatch):
+    monkeypatch.setattr(registry, "_backends", dict(registry._backends))
+    blob_storage_client = MagicMock()
+    register_backend("mock", lambda config: blob_storage_client)
+    config = LargeMessageSerializerConfig("mock://my-test-bucket", 0)
+    assert config.create_storing_client()._client is blob_storage_client
+
+
+def test_backend_module_may_register_backends_when_imported(tmp_path):
+    (tmp_path / "plugin.py").write_text(
+        "from faust_large_message_serializer.blob_storage.registry import (\n"
+        "    register_backend,\n"
+        ")\n"
+        "def create_client(config):\n"
+        "    return None\n"
+        "register_backend('plugin', create_client)\n"
+    )
+    code = (
+        "import sys\n"
+        f"sys.path.append({str(tmp_path)!r})\n"
+        "from faust_large_message_serializer.blob_storage.registry import (\n"
+        "    get_backend,\n"
+        "    register_backend,\n"
+        ")\n"
+        "register_backend('plugin', 'plugin:create_client')\n"
+        "backend = get_backend('plugin')\n"
+        "import plugin\n"
+        "assert backend is plugin.create_client\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, timeout=30)
+
+
+def test_backends_are_imported_lazily():
+    code = (
+        "import sys\n"
+        "import faust_large_message_serializer\n"
+        "assert 'boto3' not in sys.modules\n"
+        "assert 'azure.storage.blob' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_sdk_client_is_shared(monkeypatch):
+    s3_client_mock = MagicMock(side_effect=lambda *args, **kwargs: MagicMock())
+    monkeypatch.setattr(
+        "faust_large_message_serializer.blob_storage.amazon_blob_storage.boto3.client",
+        s3_client_mock,
+    )
+    first = LargeMessageSerializerConfig("s3://first-bucket", 0, "secret", "key")
+    second = LargeMessageSerializerConfig("s3://second-bucket", 0, "secret", "key")
+    other = LargeMessageSerializerConfig("s3://first-bucket", 0, "secret", "other")
+    unshared = LargeMessageSerializerConfig(
+        "s3://first-bucket", 0, "secret", "key", large_message_share_clients=False
+    )
+
+    client = first.create_storing_client()._client._s3_client
+    assert second.create_storing_client()._client._s3_client is client
+    assert other.create_storing_client()._client._s3_client is not client
+    assert unshared.create_storing_client()._client._s3_client is not client
+    assert s3_client_mock.call_count == 3
+    client_config = s3_client_mock.call_args.kwargs["config"]
+    assert client_config.max_pool_connections == 50
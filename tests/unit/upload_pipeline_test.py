@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from faust_large_message_serializer.clients.storing_client import StoringClient
+from faust_large_message_serializer.clients.upload_pipeline import UploadPipeline
+from faust_large_message_serializer.utils.uri_parser import URIParser
+
+
+def create_pipeline(blob_client, max_in_flight_bytes=100, max_in_flight_uploads=2):
+    storing_client = StoringClient(blob_client, URIParser("s3://my-test-bucket"), 5)
+    return UploadPipeline(
+        storing_client,
+        ThreadPoolExecutor(max_workers=4),
+        max_in_flight_bytes,
+        max_in_flight_uploads,
+    )
+
+
+def test_inline_messages_complete_immediately():
+    blob_client = MagicMock()
+    pipeline = create_pipeline(blob_client)
+
+    future = pipeline.submit("test-serializer", b"Hi", False)
+
+    assert future.done()
+    assert future.result() == b"\x00Hi"
+    blob_client.put_object.assert_not_called()
+
+
+def test_uploads_are_limited_by_in_flight_uploads():
+    release = threading.Event()
+    blob_client = MagicMock()
+    blob_client.put_object.side_effect = (
+        lambda data, bucket, key: release.wait() and f"s3://{bucket}/{key}"
+    )
+    pipeline = create_pipeline(blob_client, max_in_flight_uploads=2)
+
+    futures = [
+        pipeline.submit("test-serializer", b"Hello World", False) for _ in range(2)
+    ]
+    blocked = threading.Thread(
+        target=lambda: futures.append(
+            pipeline.submit("test-serializer", b"Hello World", False)
+        )
+    )
+    blocked.start()
+    blocked.join(timeout=0.2)
+
+    assert blocked.is_alive(), "Third upload should wait for capacity"
+    assert pipeline.in_flight_uploads == 2
+    assert pipeline.in_flight_bytes == 22
+
+    release.set()
+    blocked.join(timeout=5)
+    assert all(future.result(timeout=5).startswith(b"\x01s3://") for future in futures)
+    assert pipeline.in_flight_uploads == 0
+    assert pipeline.in_flight_bytes == 0
+
+
+def test_submit_async():
+    blob_client = MagicMock()
+    blob_client.put_object.side_effect = (
+        lambda data, bucket, key: f"s3://{bucket}/{key}"
+    )
+    pipeline = create_pipeline(blob_client)
+
+    async def store():
+        futures = [
+            await pipeline.submit_async("test-serializer", data)
+            for data in (b"Hello World", b"Hi")
+        ]
+        return [await future for future in futures]
+
+    backed, inline = asyncio.run(store())
+
+    assert backed.startswith(b"\x01s3://my-test-bucket/test-serializer/values/")
+    assert inline == b"\x00Hi"